@@ -0,0 +1,173 @@
+"""
+Benchmarks of the candle processing stages on synthetic data.
+
+Usage:
+    python benchmarks/bench_processor.py --sizes 1e4 1e5 1e6 --save benchmarks/baseline.json
+    python benchmarks/bench_processor.py --sizes 1e4 1e5 1e6 --compare benchmarks/baseline.json
+
+Each stage is run once untimed (warm-up, e.g. numba JIT compilation of the
+indicators kernels), timed on fresh copies of the same seeded candles (mean
+of --repeat runs), then run once more under tracemalloc for its peak memory.
+With --compare, stages slower or heavier than the baseline by more than
+--threshold are reported and the script exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# synthetic also puts src/ on sys.path
+from synthetic import generate_klines, generate_symbols
+
+from Data_processor import CandlePatterns, DataProcessor, PanelIndicators, PatternScanner, TechnicalIndicators
+
+PANEL_SYMBOLS = 100
+
+
+def _rounded(df):
+    # Inputs of the indicator stages, as prepared by process_dataframe
+    df = df.copy()
+    for col in ['open', 'high', 'low', 'close', 'volume', 'quoteVolume']:
+        df[col] = df[col].round(2)
+    return df
+
+
+STAGES = {
+    'bollinger_bands': (_rounded, TechnicalIndicators.calculate_bollinger_bands),
+    'rsi': (_rounded, TechnicalIndicators.calculate_rsi),
+    'candle_patterns': (_rounded, lambda df: CandlePatterns(df).identify_patterns()),
+    'process_dataframe': (lambda df: df.copy(), DataProcessor.process_dataframe),
+}
+# Stages run on the same total rows spread over PANEL_SYMBOLS symbols, processed at once
+PANEL_STAGES = {
+    'panel': (lambda frames: {s: df.copy() for s, df in frames.items()}, PanelIndicators.process_frames),
+    'pattern_scan': (lambda frames: PanelIndicators.build_panel(frames),
+                     lambda built: PatternScanner.scan_panel(*built)),
+}
+
+
+def _measure(prepare, run, data, repeat):
+    """Returns (mean wall time in seconds, peak traced memory in bytes)."""
+    # Warm-up: JIT compilation and first-call caches are not timed
+    run(prepare(data))
+
+    times = []
+    for _ in range(repeat):
+        args = prepare(data)
+        start = time.perf_counter()
+        run(args)
+        times.append(time.perf_counter() - start)
+
+    args = prepare(data)
+    tracemalloc.start()
+    run(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sum(times) / len(times), peak
+
+
+def run_benchmarks(sizes, repeat=3, interval='1h', seed=0, stages=None):
+    """
+    Runs every stage for every size.
+
+    Returns:
+    -------
+    A list of dictionaries (stage, rows, seconds, rows_per_sec, peak_mb).
+    """
+    stages = stages or list(STAGES) + list(PANEL_STAGES)
+    results = []
+    for rows in sizes:
+        klines = generate_klines(rows, interval, seed=seed)
+        for stage in stages:
+            if stage in PANEL_STAGES:
+                symbols = min(PANEL_SYMBOLS, max(1, rows // 100))
+                frames = generate_symbols(symbols, rows // symbols, interval, seed=seed)
+                prepare, run = PANEL_STAGES[stage]
+                seconds, peak = _measure(prepare, run, frames, repeat)
+            else:
+                prepare, run = STAGES[stage]
+                seconds, peak = _measure(prepare, run, klines, repeat)
+
+            result = {
+                'stage': stage,
+                'rows': rows,
+                'seconds': round(seconds, 6),
+                'rows_per_sec': round(rows / seconds),
+                'peak_mb': round(peak / 2**20, 2),
+            }
+            print(f"{stage:>18} {rows:>10} rows  {seconds:9.4f}s  {result['rows_per_sec']:>12} rows/s  "
+                  f"{result['peak_mb']:>9.2f} MB")
+            results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the ratio to the baseline of each result; returns the regressions."""
+    reference = {(r['stage'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        base = reference.get((result['stage'], result['rows']))
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds']
+        memory_ratio = result['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        flag = time_ratio > threshold or memory_ratio > threshold
+        print(f"{result['stage']:>18} {result['rows']:>10} rows  time x{time_ratio:5.2f}  "
+              f"memory x{memory_ratio:5.2f}{'  REGRESSION' if flag else ''}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e4, 1e5, 1e6],
+                        help="Candle counts, from 1e4 up to 1e7")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES) + list(PANEL_STAGES))
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help="Write the results to this JSON baseline")
+    parser.add_argument('--compare', help="Compare the results with this JSON baseline")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="Slowdown/memory ratio reported as a regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes]
+    results = run_benchmarks(sizes, args.repeat, args.interval, args.seed, args.stages)
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'interval': args.interval,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src'))
+
+from extract import interval_to_milliseconds
+
+
+def generate_klines(rows, interval='1h', seed=0, start='2017-01-01', price=30000.0, volatility=0.01):
+    """
+    Generates reproducible OHLCV candles shaped like fetch_data_klines(as_frame=True).
+
+    Closes follow a geometric random walk, each candle's high/low wrap its
+    open/close, volumes are log-normal.
+
+    Parameters:
+    ----------
+    rows: int
+        Number of candles.
+    interval: str
+        Candle interval (e.g. "1h", "15m").
+    seed: int
+        Seed of the random generator, same seed -> same candles.
+    start: str
+        openTime of the first candle.
+    price: float
+        First open price.
+    volatility: float
+        Standard deviation of the per-candle log return.
+
+    Returns:
+    -------
+    A DataFrame sorted by ascending openTime.
+    """
+    rng = np.random.default_rng(seed)
+    interval_ms = interval_to_milliseconds(interval)
+
+    close = price * np.exp(np.cumsum(rng.normal(0, volatility, rows)))
+    open_ = np.empty(rows)
+    open_[0] = price
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0, volatility / 2, (2, rows)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(mean=3, sigma=1, size=rows)
+
+    open_time = pd.Timestamp(start).value // 10**6 + np.arange(rows, dtype=np.int64) * interval_ms
+    return pd.DataFrame({
+        'openTime': pd.to_datetime(open_time, unit='ms'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+        'closeTime': pd.to_datetime(open_time + interval_ms - 1, unit='ms'),
+        'quoteVolume': volume * (high + low) / 2,
+        'numTrades': rng.poisson(500, rows),
+        'takerBuyBaseVolume': volume / 2,
+        'takerBuyQuoteVolume': volume * (high + low) / 4,
+        'ignore': np.zeros(rows),
+    })
+
+
+def generate_symbols(symbols, rows, interval='1h', seed=0):
+    """
+    Generates `symbols` independent symbols of `rows` candles each.
+
+    Returns:
+    -------
+    A dictionary symbol name -> DataFrame (see generate_klines).
+    """
+    rng = np.random.default_rng(seed)
+    prices = rng.lognormal(mean=3, sigma=2, size=symbols)
+    return {
+        f"SYM{i:04d}USDT": generate_klines(rows, interval, seed=seed + i + 1, price=float(prices[i]))
+        for i in range(symbols)
+    }
@@ -1,4 +1,5 @@
 from pymongo import MongoClient
+import numpy as np
 import pandas as pd
 import json
 import plotly
@@ -7,6 +8,9 @@ from plotly.subplots import make_subplots
 import logging
 from typing import Dict, List, Any
 from datetime import datetime, timedelta
+from src.indicators import bollinger_bands, ema, macd, rsi, stochastic
+from src.schema import to_compact
+from src.buckets import BUCKET_COLLECTION, latest_open_time, read_buckets
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO,
@@ -25,22 +29,9 @@ class TechnicalIndicators:
         if not all(col in df.columns for col in ['high', 'low', 'close']):
             raise ValueError("DataFrame doit contenir les colonnes 'high', 'low', 'close'")
 
-        # Utilise le prix typique pour le calcul
-        typical_price = (df['high'] + df['low'] + df['close']) / 3
-        
-        # Moyenne mobile
-        df['BB_MA'] = typical_price.rolling(window=n).mean()
-        
-        # Écart-type
-        stddev = typical_price.rolling(window=n).std()
-        
-        # Bandes supérieure et inférieure
-        df['BB_UPPER'] = df['BB_MA'] + (stddev * s)
-        df['BB_LOWER'] = df['BB_MA'] - (stddev * s)
-        
-        # Arrondir les valeurs
-        for col in ['BB_MA', 'BB_UPPER', 'BB_LOWER']:
-            df[col] = df[col].round(2)
+        # Prix typique, bandes calculées depuis la moyenne non arrondie
+        df['BB_MA'], df['BB_UPPER'], df['BB_LOWER'] = bollinger_bands(
+            df['high'], df['low'], df['close'], n, s, bands_from_rounded_ma=False)
             
         return df
 
@@ -53,21 +44,8 @@ class TechnicalIndicators:
         if 'close' not in df.columns:
             raise ValueError("DataFrame doit contenir la colonne 'close'")
 
-        # Calcul des variations
-        delta = df['close'].diff()
-        
-        # Sépare les gains et les pertes
-        gain = (delta.where(delta > 0, 0)).round(2)
-        loss = (-delta.where(delta < 0, 0)).round(2)
-        
-        # Calcul des moyennes
-        avg_gain = gain.rolling(window=n, min_periods=1).mean()
-        avg_loss = loss.rolling(window=n, min_periods=1).mean()
-        
-        # Calcul du RSI
-        rs = avg_gain / avg_loss
-        df['RSI'] = 100 - (100 / (1 + rs))
-        df['RSI'] = df['RSI'].round(2)
+        # Moyennes des gains et pertes dès la première bougie
+        df['RSI'] = rsi(df['close'], n, min_periods=1)
         
         return df
 
@@ -81,7 +59,7 @@ class TechnicalIndicators:
             raise ValueError("DataFrame doit contenir la colonne 'close'")
             
         for period in periods:
-            df[f'EMA_{period}'] = df['close'].ewm(span=period, adjust=False).mean().round(2)
+            df[f'EMA_{period}'] = np.round(ema(df['close'], period), 2)
         
         return df
 
@@ -96,14 +74,7 @@ class TechnicalIndicators:
         if 'close' not in df.columns:
             raise ValueError("DataFrame doit contenir la colonne 'close'")
             
-        # Calcul des EMA
-        exp1 = df['close'].ewm(span=fast, adjust=False).mean()
-        exp2 = df['close'].ewm(span=slow, adjust=False).mean()
-        
-        # Calcul du MACD
-        df['MACD_LINE'] = (exp1 - exp2).round(2)
-        df['MACD_SIGNAL'] = df['MACD_LINE'].ewm(span=signal, adjust=False).mean().round(2)
-        df['MACD_HIST'] = (df['MACD_LINE'] - df['MACD_SIGNAL']).round(2)
+        df['MACD_LINE'], df['MACD_SIGNAL'], df['MACD_HIST'] = macd(df['close'], fast, slow, signal)
         
         return df
 
@@ -117,22 +88,25 @@ class TechnicalIndicators:
         if not all(col in df.columns for col in ['high', 'low', 'close']):
             raise ValueError("DataFrame doit contenir les colonnes 'high', 'low', 'close'")
             
-        # Calcul du %K
-        lowest_low = df['low'].rolling(window=k_period).min()
-        highest_high = df['high'].rolling(window=k_period).max()
-        df['STOCH_K'] = ((df['close'] - lowest_low) / (highest_high - lowest_low) * 100).round(2)
-        
-        # Calcul du %D (moyenne mobile simple du %K)
-        df['STOCH_D'] = df['STOCH_K'].rolling(window=d_period).mean().round(2)
+        # %K, puis %D (moyenne mobile simple du %K)
+        df['STOCH_K'], df['STOCH_D'] = stochastic(df['high'], df['low'], df['close'], k_period, d_period)
         
         return df
     
 
 class CryptoAnalyzer:
-    def __init__(self, mongodb_uri):
+    # Intervalles dérivés par l'ETL (config "resample_intervals")
+    HIGHER_TIMEFRAMES = ('1d', '1w', '1M')
+
+    def __init__(self, mongodb_uri, compact=False, bucketed=False):
         self.mongodb_uri = mongodb_uri
+        # Données chargées en float32/int8 (voir src.schema.to_compact)
+        self.compact = compact
+        # Bougies stockées en buckets de tableaux (voir src.buckets)
+        self.bucketed = bucketed
         self.client = None
         self.db = None
+        self.candles = None
         self.available_symbols = []
         self._init_connection()
 
@@ -142,13 +116,14 @@ class CryptoAnalyzer:
             logger.info(f"Tentative de connexion à MongoDB...")
             self.client = MongoClient(self.mongodb_uri)
             self.db = self.client.Cryptobot
+            self.candles = self.db[BUCKET_COLLECTION] if self.bucketed else self.db.market_data
             logger.info(f"Connexion à MongoDB établie avec succès")
             self.init_symbols()
             collections = self.db.list_collection_names()
             logger.info(f"Collections disponibles: {collections}")
 
-            count = self.db.market_data.count_documents({})
-            logger.info(f"Nombre de documents dans market_data: {count}")
+            count = self.candles.count_documents({})
+            logger.info(f"Nombre de documents dans {self.candles.name}: {count}")
 
 
         except Exception as e:
@@ -162,11 +137,11 @@ class CryptoAnalyzer:
             collections = self.db.list_collection_names()
             logger.info(f"Collections disponibles: {collections}")
 
-            count = self.db.market_data.count_documents({})
-            logger.info(f"Nombre de documents dans market_data: {count}")
+            count = self.candles.count_documents({})
+            logger.info(f"Nombre de documents dans {self.candles.name}: {count}")
 
 
-            self.available_symbols = self.db.market_data.distinct("symbol")
+            self.available_symbols = self.candles.distinct("symbol")
             logger.info(f"Symboles disponibles: {self.available_symbols}")
             return self.available_symbols
             
@@ -193,19 +168,28 @@ class CryptoAnalyzer:
         delta = timeframe_mapping[timeframe]
         return None if delta is None else end_date - delta
 
-    def load_data(self, symbol: str, timeframe: str = '1Y') -> pd.DataFrame:
+    def load_data(self, symbol: str, timeframe: str = '1Y', interval: str = None) -> pd.DataFrame:
         try:
             logger.info(f"Chargement des données pour {symbol} sur {timeframe}")
+
+            # Bougies d'intervalle supérieur dérivées par l'ETL (market_data_1d, _1w, _1M)
+            if interval is not None and interval not in self.HIGHER_TIMEFRAMES:
+                raise ValueError(f"Intervalle non disponible: {interval}")
+            collection = self.candles if interval is None else self.db[f"market_data_{interval}"]
+            bucketed = self.bucketed and interval is None
             
             # Obtenir la dernière date disponible
-            latest_record = self.db.market_data.find_one(
-                {"symbol": symbol},
-                sort=[("openTime", -1)]
-            )
-            if not latest_record:
+            if bucketed:
+                end_date = latest_open_time(collection, symbol)
+            else:
+                latest_record = collection.find_one(
+                    {"symbol": symbol},
+                    sort=[("openTime", -1)]
+                )
+                end_date = latest_record['openTime'] if latest_record else None
+            if end_date is None:
                 return pd.DataFrame()
                 
-            end_date = latest_record['openTime']
             logger.info(f"Dernière date disponible: {end_date}")
             
             # Calculer la date de début en fonction du timeframe
@@ -221,7 +205,6 @@ class CryptoAnalyzer:
                 }
                 
             logger.info(f"Requête MongoDB: {query}")
-            query = {"symbol": symbol}
             projection = {
             "openTime": 1,
             "open": 1,
@@ -234,8 +217,12 @@ class CryptoAnalyzer:
             "indicator": 1,
             "_id": 0
             }
-            cursor = self.db.market_data.find(query,projection).sort("openTime", 1)
-            df = pd.DataFrame(list(cursor))
+            if bucketed:
+                # Colonnes décodées directement des tableaux des buckets
+                df = read_buckets(collection, symbol, start_date, end_date)
+            else:
+                cursor = collection.find(query,projection).sort("openTime", 1)
+                df = pd.DataFrame(list(cursor))
 
             if 'indicator' in df.columns:
                 indicator_df = pd.json_normalize(df['indicator'])
@@ -276,6 +263,9 @@ class CryptoAnalyzer:
                 if col in df.columns:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
             
+            if self.compact:
+                df = to_compact(df)
+
             logger.info(f"Données chargées: {len(df)} entrées de {df['openTime'].min()} à {df['openTime'].max()}")
             return df
             
@@ -327,7 +317,7 @@ class CryptoAnalyzer:
             logger.error(f"Erreur lors du calcul des statistiques 24h: {e}")
             return {}
 
-    def analyze_symbol(self, symbol: str, timeframe: str = '1Y', indicators: List[str] = None) -> Dict[str, Any]:
+    def analyze_symbol(self, symbol: str, timeframe: str = '1Y', indicators: List[str] = None, interval: str = None) -> Dict[str, Any]:
         """
         Analyse un symbole avec les indicateurs spécifiés
         
@@ -335,6 +325,7 @@ class CryptoAnalyzer:
             symbol (str): Le symbole à analyser
             timeframe (str): La période d'analyse ('1D', '7D', '1M', '3M', '6M', '1Y', 'ALL')
             indicators (List[str]): Liste des indicateurs à calculer et afficher
+            interval (str): Intervalle des bougies ('1d', '1w', '1M'), celui de l'ETL par défaut
             
         Returns:
             Dict[str, Any]: Résultats de l'analyse incluant les graphiques et statistiques
@@ -353,7 +344,7 @@ class CryptoAnalyzer:
                     return {}
 
             logger.info(f"Début de l'analyse pour {symbol} avec indicateurs: {indicators}")
-            df = self.load_data(symbol, timeframe)
+            df = self.load_data(symbol, timeframe, interval)
             
             if df.empty:
                 logger.error(f"DataFrame vide pour {symbol}")
@@ -385,7 +376,7 @@ class CryptoAnalyzer:
                 'timeframe': timeframe,
                 'technical_chart': json.dumps(technical_chart, cls=plotly.utils.PlotlyJSONEncoder),
                 'last_update': df['openTime'].max().strftime("%Y-%m-%d %H:%M:%S"),
-                'current_price': df['close'].iloc[-1] if not df.empty else None,
+                'current_price': float(df['close'].iloc[-1]) if not df.empty else None,
                 'price_change_24h': stats_24h.get('price_change_24h', None),
                 'price_change_percentage_24h': stats_24h.get('price_change_percentage_24h', None),
                 'high_24h': stats_24h.get('high_24h', None),
@@ -404,7 +395,7 @@ class CryptoAnalyzer:
     def init_symbols(self):
         """Initialise la liste des symboles disponibles"""
         try:
-            self.available_symbols = self.db.market_data.distinct("symbol")
+            self.available_symbols = self.candles.distinct("symbol")
             logger.info(f"Symboles disponibles: {self.available_symbols}")
             return self.available_symbols
         except Exception as e:
@@ -1,33 +1,25 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List
-from extract import fetch_data_klines
+from typing import Dict, Iterable, Iterator, List
+from extract import fetch_data_klines, interval_to_milliseconds
+import indicators
+from schema import to_compact
 
 class TechnicalIndicators:
     @staticmethod
     def calculate_bollinger_bands(df: pd.DataFrame, n=20, s=2) -> pd.DataFrame:
         """Calcul des bandes de Bollinger"""
-        typical_price = (df['high'] + df['low'] + df['close']) / 3
-        df['BB_MA'] = typical_price.rolling(window=n).mean().round(2)
-        stddev = typical_price.rolling(window=n).std()
-        df['BB_UPPER'] = (df['BB_MA'] + (stddev * s)).round(2)
-        df['BB_LOWER'] = (df['BB_MA'] - (stddev * s)).round(2)
+        df['BB_MA'], df['BB_UPPER'], df['BB_LOWER'] = indicators.bollinger_bands(
+            df['high'], df['low'], df['close'], n, s)
         return df
 
     @staticmethod
     def calculate_rsi(df: pd.DataFrame, n=14) -> pd.DataFrame:
         """Calcul du RSI"""
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).round(2)
-        loss = (-delta.where(delta < 0, 0)).round(2)
-        
-        avg_gain = gain.rolling(window=n).mean()
-        avg_loss = loss.rolling(window=n).mean()
-        
-        rs = avg_gain / avg_loss
-        df['RSI'] = (100 - (100 / (1 + rs))).round(2)
+        df['RSI'] = indicators.rsi(df['close'], n)
         return df
 
 class CandlePatterns:
@@ -37,37 +29,403 @@ class CandlePatterns:
 
     def calculate_basic_properties(self):
         """Calcul des propriétés de base des bougies"""
-        self.df['body_size'] = (abs(self.df['close'] - self.df['open'])).round(2)
-        self.df['upper_shadow'] = (self.df['high'] - self.df[['open', 'close']].max(axis=1)).round(2)
-        self.df['lower_shadow'] = (self.df[['open', 'close']].min(axis=1) - self.df['low']).round(2)
-        self.df['candle_size'] = (self.df['high'] - self.df['low']).round(2)
+        (self.df['body_size'], self.df['upper_shadow'],
+         self.df['lower_shadow'], self.df['candle_size']) = indicators.candle_properties(
+            self.df['open'], self.df['high'], self.df['low'], self.df['close'])
 
     def identify_patterns(self) -> pd.DataFrame:
         """Identification des patterns de chandelier"""
-        # Doji
-        self.df['DOJI'] = (self.df['body_size'] <= self.df['candle_size'] * 0.1).astype(int)
-        
-        # Marteau et Étoile filante
-        hammer_condition = (
-            (self.df['lower_shadow'] > self.df['body_size'] * 2) & 
-            (self.df['upper_shadow'] <= self.df['body_size'] * 0.5)
-        )
-        shooting_star_condition = (
-            (self.df['upper_shadow'] > self.df['body_size'] * 2) & 
-            (self.df['lower_shadow'] <= self.df['body_size'] * 0.5)
-        )
-        
-        self.df['HAMMER'] = hammer_condition.astype(int)
-        self.df['SHOOTING_STAR'] = shooting_star_condition.astype(int)
+        # Doji, Marteau et Étoile filante
+        self.df['DOJI'], self.df['HAMMER'], self.df['SHOOTING_STAR'] = indicators.candle_patterns(
+            self.df['body_size'].to_numpy(), self.df['upper_shadow'].to_numpy(),
+            self.df['lower_shadow'].to_numpy(), self.df['candle_size'].to_numpy())
         
         return self.df
 
+class TradeBars:
+    @staticmethod
+    def aggregate(trades: Dict[str, np.ndarray], interval: str,
+                  time_col='time', price_col='price', qty_col='qty', maker_col='isBuyerMaker',
+                  first_id_col='firstTradeId', last_id_col='lastTradeId') -> pd.DataFrame:
+        """
+        Agrégation vectorisée des trades en bougies à n'importe quel intervalle
+        (OHLCV, VWAP, volumes acheteurs/vendeurs preneurs).
+        Les intervalles sans aucun trade ne produisent pas de bougie.
+        """
+        interval_ms = interval_to_milliseconds(interval)
+        order = np.argsort(trades[time_col], kind='stable')
+        times = trades[time_col][order]
+        price = trades[price_col][order]
+        qty = trades[qty_col][order]
+        buyer_is_maker = trades[maker_col][order].astype(bool)
+
+        if len(times) == 0:
+            return pd.DataFrame(columns=['openTime', 'open', 'high', 'low', 'close', 'volume', 'quoteVolume',
+                                         'vwap', 'numTrades', 'takerBuyVolume', 'takerSellVolume'])
+
+        # Début de chaque bougie dans le tableau trié
+        bucket = times // interval_ms * interval_ms
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        ends = np.r_[starts[1:], len(times)]
+
+        quote = price * qty
+        volume = np.add.reduceat(qty, starts)
+        quote_volume = np.add.reduceat(quote, starts)
+        # Acheteur preneur quand l'acheteur n'est pas le maker
+        taker_buy = np.add.reduceat(np.where(buyer_is_maker, 0.0, qty), starts)
+
+        if first_id_col in trades and last_id_col in trades:
+            trade_count = trades[last_id_col][order] - trades[first_id_col][order] + 1
+            num_trades = np.add.reduceat(trade_count, starts)
+        else:
+            num_trades = ends - starts
+
+        return pd.DataFrame({
+            'openTime': pd.to_datetime(bucket[starts], unit='ms'),
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends - 1],
+            'volume': volume,
+            'quoteVolume': quote_volume,
+            'vwap': quote_volume / volume,
+            'numTrades': num_trades,
+            'takerBuyVolume': taker_buy,
+            'takerSellVolume': volume - taker_buy,
+        })
+
+class IncrementalIndicators:
+    """
+    Calcul incrémental des indicateurs : seules les nouvelles bougies sont traitées,
+    à partir d'un état persistant par symbole (fenêtres glissantes de la BB et du RSI,
+    dernière clôture). Coût constant par bougie, résultats identiques à
+    DataProcessor.process_dataframe.
+    """
+    BB_WINDOW = 20
+    BB_STD = 2
+    RSI_WINDOW = 14
+
+    @staticmethod
+    def new_state(symbol: str) -> Dict:
+        """État vide d'un symbole (aucune bougie vue)"""
+        return {
+            'symbol': symbol,
+            'last_open_time': None,
+            'last_close': None,
+            'typical_prices': [],
+            'gains': [],
+            'losses': [],
+        }
+
+    @classmethod
+    def _step(cls, state: Dict, high: float, low: float, close: float):
+        """Met à jour les fenêtres avec une bougie et renvoie (BB_MA, BB_UPPER, BB_LOWER, RSI)"""
+        high, low, close = float(high), float(low), float(close)
+        typical = state['typical_prices'][-(cls.BB_WINDOW - 1):] + [(high + low + close) / 3]
+
+        # Même convention que le calcul complet : pas de variation sur la première bougie
+        delta = 0.0 if state['last_close'] is None else close - state['last_close']
+        gains = state['gains'][-(cls.RSI_WINDOW - 1):] + [float(np.round(max(delta, 0.0), 2))]
+        losses = state['losses'][-(cls.RSI_WINDOW - 1):] + [float(np.round(-min(delta, 0.0), 2))]
+
+        # Mêmes noyaux que le calcul complet, appliqués à la seule dernière fenêtre
+        bb_ma = bb_upper = bb_lower = rsi = np.nan
+        if len(typical) == cls.BB_WINDOW:
+            bands = indicators.bollinger_from_typical(np.array(typical), cls.BB_WINDOW, cls.BB_STD)
+            bb_ma, bb_upper, bb_lower = (band[-1] for band in bands)
+        if len(gains) == cls.RSI_WINDOW:
+            rsi = indicators.rsi_from_averages(indicators.rolling_mean(gains, cls.RSI_WINDOW),
+                                               indicators.rolling_mean(losses, cls.RSI_WINDOW))[-1]
+
+        updated = {'typical_prices': typical, 'gains': gains, 'losses': losses, 'last_close': close}
+        return (bb_ma, bb_upper, bb_lower, rsi), updated
+
+    @classmethod
+    def update(cls, state: Dict, df: pd.DataFrame, now=None):
+        """
+        Calcule les indicateurs des bougies postérieures à l'état et fait avancer l'état.
+        Seules les bougies clôturées sont intégrées à l'état : la bougie en cours est
+        calculée mais sera recalculée au prochain passage.
+        Renvoie (DataFrame au format de process_dataframe, nouvel état).
+        """
+        df = df.copy()
+        df['openTime'] = pd.to_datetime(df['openTime'], unit='ms')
+        df['closeTime'] = pd.to_datetime(df['closeTime'], unit='ms')
+        df = df.sort_values('openTime').reset_index(drop=True)
+        if state['last_open_time'] is not None:
+            df = df[df['openTime'] > pd.Timestamp(state['last_open_time'])].reset_index(drop=True)
+
+        numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'quoteVolume']
+        for col in numeric_cols:
+            df[col] = pd.to_numeric(df[col], errors='coerce').round(2)
+
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None) if now is None else pd.Timestamp(now)
+        state = dict(state)
+        rows = []
+        for open_time, close_time, high, low, close in zip(df['openTime'], df['closeTime'],
+                                                            df['high'], df['low'], df['close']):
+            values, updated = cls._step(state, high, low, close)
+            rows.append(values)
+            if close_time < now:
+                state.update(updated, last_open_time=open_time.to_pydatetime())
+
+        rows = np.array(rows, dtype=float).reshape(-1, 4)
+        for i, col in enumerate(['BB_MA', 'BB_UPPER', 'BB_LOWER', 'RSI']):
+            df[col] = rows[:, i]
+
+        return DataProcessor.finalize(df), state
+
+class PanelIndicators:
+    """
+    Calcul vectorisé des indicateurs sur un panel (temps × symbole) : chaque
+    indicateur est évalué pour tous les symboles en quelques opérations sur des
+    tableaux 2-D, au lieu d'un pipeline pandas par symbole.
+    Les historiques de longueurs différentes sont alignés sur leur bougie la plus
+    récente et complétés par des NaN (masque `valid`).
+    """
+    FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+    @staticmethod
+    def build_panel(frames: Dict[str, pd.DataFrame]):
+        """Empile les bougies brutes de chaque symbole dans des tableaux (temps × symbole)"""
+        symbols = list(frames)
+        frames = {symbol: df.sort_values('openTime') for symbol, df in frames.items()}
+        length = max((len(df) for df in frames.values()), default=0)
+
+        panel = {field: np.full((length, len(symbols)), np.nan) for field in PanelIndicators.FIELDS}
+        panel['openTime'] = np.full((length, len(symbols)), np.datetime64('NaT'), dtype='datetime64[ms]')
+        for j, symbol in enumerate(symbols):
+            df = frames[symbol]
+            start = length - len(df)
+            panel['openTime'][start:, j] = pd.to_datetime(df['openTime'], unit='ms').to_numpy()
+            for field in PanelIndicators.FIELDS:
+                panel[field][start:, j] = pd.to_numeric(df[field], errors='coerce').round(2).to_numpy(dtype=float)
+        panel['valid'] = ~np.isnat(panel['openTime'])
+        return symbols, panel
+
+    @staticmethod
+    def compute(panel: Dict[str, np.ndarray], bb_window=20, bb_std=2, rsi_window=14) -> Dict[str, np.ndarray]:
+        """Indicateurs, patterns et tendance de tout le panel"""
+        open_, high, low, close, volume = (panel[field] for field in PanelIndicators.FIELDS)
+        out = {}
+
+        # Bandes de Bollinger (les fenêtres incomplètes ou sur le remplissage valent NaN)
+        out['BB_MA'], out['BB_UPPER'], out['BB_LOWER'] = indicators.bollinger_bands(
+            high, low, close, bb_window, bb_std)
+
+        # RSI : la première bougie de chaque symbole a une variation nulle, comme en pandas
+        gain, loss = indicators.gains_losses(close)
+        gain[~panel['valid']] = np.nan
+        loss[~panel['valid']] = np.nan
+        out['RSI'] = indicators.rsi_from_averages(indicators.rolling_mean(gain, rsi_window),
+                                                  indicators.rolling_mean(loss, rsi_window))
+
+        # Patterns de chandelier
+        out['DOJI'], out['HAMMER'], out['SHOOTING_STAR'] = indicators.candle_patterns(
+            *indicators.candle_properties(open_, high, low, close))
+        with np.errstate(invalid='ignore'):
+            out['trend'] = np.where(close > open_, 1, -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['volume_price_ratio'] = np.round(volume / close, 4)
+        return out
+
+    @staticmethod
+    def process_frames(frames: Dict[str, pd.DataFrame], compact=False, dropna=True) -> Dict[str, pd.DataFrame]:
+        """
+        Équivalent de DataProcessor.process_dataframe pour tous les symboles à la fois.
+        Renvoie un DataFrame par symbole, au format de process_dataframe.
+        """
+        symbols, panel = PanelIndicators.build_panel(frames)
+        computed = PanelIndicators.compute(panel)
+        columns = {**panel, **computed}
+
+        results = {}
+        for j, symbol in enumerate(symbols):
+            valid = panel['valid'][:, j]
+            df = pd.DataFrame({col: columns[col][valid, j] for col in DataProcessor.FINAL_COLUMNS})
+            if dropna:
+                df = df.dropna()
+            results[symbol] = to_compact(df) if compact else df
+        return results
+
+class PatternScanner:
+    """
+    Détection des patterns sur plusieurs bougies (indicators.MULTI_CANDLE_PATTERNS)
+    pour tous les symboles en une passe sur le panel (temps × symbole).
+    Le résultat est une table d'événements (symbol, openTime, pattern), une ligne
+    par pattern détecté, datée de la dernière bougie du pattern.
+    """
+    EVENT_COLUMNS = ['symbol', 'openTime', 'pattern']
+    # Bougies nécessaires au pattern le plus long
+    PATTERN_LENGTH = 3
+
+    @staticmethod
+    def scan_panel(symbols: List[str], panel: Dict[str, np.ndarray], last=None) -> pd.DataFrame:
+        """Événements d'un panel construit par PanelIndicators.build_panel (les `last` dernières bougies si précisé)"""
+        # Seules les bougies examinées et les précédentes nécessaires aux patterns sont calculées
+        start = 0 if last is None else max(len(panel['close']) - last - PatternScanner.PATTERN_LENGTH + 1, 0)
+        patterns = indicators.multi_candle_patterns(
+            *(panel[field][start:] for field in ['open', 'high', 'low', 'close']))
+        skip = 0 if last is None else max(len(panel['close']) - start - last, 0)
+
+        times, columns, names = [], [], []
+        for name, found in patterns.items():
+            rows, cols = np.nonzero(found[skip:])
+            times.append(panel['openTime'][rows + start + skip, cols])
+            columns.append(cols)
+            names.append(np.full(len(rows), name, dtype=object))
+
+        events = pd.DataFrame({
+            'symbol': np.asarray(symbols, dtype=object)[np.concatenate(columns)],
+            'openTime': np.concatenate(times),
+            'pattern': np.concatenate(names),
+        })
+        return events.sort_values(['openTime', 'symbol'], kind='stable', ignore_index=True)
+
+    @staticmethod
+    def scan(frames: Dict[str, pd.DataFrame], last=None) -> pd.DataFrame:
+        """
+        Événements de tous les symboles à partir de leurs bougies brutes.
+        Avec `last`, seules les `last` dernières bougies de chaque symbole sont examinées
+        (ex. last=1 après chaque clôture).
+        """
+        if last is not None:
+            frames = {symbol: df.sort_values('openTime').tail(last + PatternScanner.PATTERN_LENGTH - 1)
+                      for symbol, df in frames.items()}
+        symbols, panel = PanelIndicators.build_panel(frames)
+        return PatternScanner.scan_panel(symbols, panel, last)
+
+class CandleResampler:
+    """
+    Agrégation des bougies de base (ex. 4h) en bougies d'intervalle supérieur
+    (1d, 1w, 1M...), vectorisée sur tous les symboles d'un DataFrame long.
+    Les bougies en cours sont complétées au fil des nouvelles bougies de base clôturées.
+    """
+    BAR_COLUMNS = ['symbol', 'openTime', 'closeTime', 'open', 'high', 'low', 'close', 'volume',
+                   'baseCount', 'firstBaseOpenTime', 'lastBaseOpenTime', 'complete']
+
+    @staticmethod
+    def bucket_start(open_times: np.ndarray, interval: str) -> np.ndarray:
+        """Début de la bougie `interval` contenant chaque openTime"""
+        open_times = np.asarray(open_times, dtype='datetime64[ms]')
+        if interval.endswith('M'):
+            months = int(interval[:-1])
+            month_index = open_times.astype('datetime64[M]').astype(np.int64)
+            return (month_index - month_index % months).astype('datetime64[M]').astype('datetime64[ms]')
+
+        interval_ms = interval_to_milliseconds(interval)
+        # Les bougies hebdomadaires commencent le lundi (le 01/01/1970 est un jeudi)
+        offset = 4 * interval_to_milliseconds('1d') if interval.endswith('w') else 0
+        timestamps = open_times.astype(np.int64)
+        return (timestamps - (timestamps - offset) % interval_ms).astype('datetime64[ms]')
+
+    @staticmethod
+    def bucket_end(starts: np.ndarray, interval: str) -> np.ndarray:
+        """Début de la bougie suivante"""
+        if interval.endswith('M'):
+            return (starts.astype('datetime64[M]') + int(interval[:-1])).astype('datetime64[ms]')
+        return starts + np.timedelta64(interval_to_milliseconds(interval), 'ms')
+
+    @staticmethod
+    def complete_flags(bars: pd.DataFrame, base_interval: str) -> np.ndarray:
+        """
+        1 quand la bougie couvre toute sa période : sa première bougie de base ouvre la période
+        (ex. historique tronqué par le TTL de market_data) et sa dernière la clôture
+        """
+        base_ms = np.timedelta64(interval_to_milliseconds(base_interval), 'ms')
+        first_base = bars['firstBaseOpenTime'].to_numpy(dtype='datetime64[ms]')
+        last_base = bars['lastBaseOpenTime'].to_numpy(dtype='datetime64[ms]')
+        starts = first_base == bars['openTime'].to_numpy(dtype='datetime64[ms]')
+        ends = last_base + base_ms > bars['closeTime'].to_numpy(dtype='datetime64[ms]')
+        return (starts & ends).astype(int)
+
+    @staticmethod
+    def resample(df: pd.DataFrame, interval: str, base_interval: str) -> pd.DataFrame:
+        """
+        Une bougie par (symbole, période) à partir des bougies de base
+        (colonnes symbol, openTime, open, high, low, close, volume).
+        complete vaut 1 quand la période est couverte de sa première à sa dernière bougie de base.
+        """
+        if df.empty:
+            return pd.DataFrame(columns=CandleResampler.BAR_COLUMNS)
+
+        df = df.sort_values(['symbol', 'openTime'], kind='stable')
+        symbols = df['symbol'].to_numpy()
+        times = df['openTime'].to_numpy().astype('datetime64[ms]')
+        starts = CandleResampler.bucket_start(times, interval)
+
+        # Début de chaque groupe (symbole, période) dans le tableau trié
+        first = np.flatnonzero(np.r_[True, (symbols[1:] != symbols[:-1]) | (starts[1:] != starts[:-1])])
+        last = np.r_[first[1:], len(df)] - 1
+
+        prices = {col: df[col].to_numpy(dtype=float) for col in ['open', 'high', 'low', 'close', 'volume']}
+        close_time = CandleResampler.bucket_end(starts[first], interval) - np.timedelta64(1, 'ms')
+
+        bars = pd.DataFrame({
+            'symbol': symbols[first],
+            'openTime': starts[first],
+            'closeTime': close_time,
+            'open': prices['open'][first],
+            'high': np.maximum.reduceat(prices['high'], first),
+            'low': np.minimum.reduceat(prices['low'], first),
+            'close': prices['close'][last],
+            'volume': np.add.reduceat(prices['volume'], first),
+            'baseCount': last - first + 1,
+            'firstBaseOpenTime': times[first],
+            'lastBaseOpenTime': times[last],
+        })
+        bars['complete'] = CandleResampler.complete_flags(bars, base_interval)
+        return bars
+
+    @staticmethod
+    def merge_open_bars(previous: pd.DataFrame, bars: pd.DataFrame, base_interval: str) -> pd.DataFrame:
+        """
+        Complète les bougies en cours déjà stockées (`previous`, une par symbole au plus)
+        avec les bougies calculées sur les nouvelles bougies de base seulement.
+        """
+        if previous.empty or bars.empty:
+            return bars
+
+        # Bougies stockées sans firstBaseOpenTime : couverture inconnue, jamais complètes
+        previous = previous.reindex(columns=['symbol', 'openTime', 'open', 'high', 'low', 'volume', 'baseCount',
+                                             'firstBaseOpenTime'])
+        merged = bars.merge(previous, on=['symbol', 'openTime'], how='left', suffixes=('', '_previous'))
+        known = merged['open_previous'].notna().to_numpy()
+
+        merged.loc[known, 'open'] = merged.loc[known, 'open_previous']
+        merged.loc[known, 'firstBaseOpenTime'] = pd.to_datetime(merged.loc[known, 'firstBaseOpenTime_previous'])
+        merged['high'] = np.fmax(merged['high'], merged['high_previous'])
+        merged['low'] = np.fmin(merged['low'], merged['low_previous'])
+        merged['volume'] = merged['volume'] + merged['volume_previous'].fillna(0)
+        merged['baseCount'] = merged['baseCount'] + merged['baseCount_previous'].fillna(0).astype(int)
+        merged['complete'] = CandleResampler.complete_flags(merged, base_interval)
+        return merged[CandleResampler.BAR_COLUMNS]
+
 class DataProcessor:
+    # Colonnes finales
+    FINAL_COLUMNS = [
+        'openTime', 'open', 'high', 'low', 'close', 'volume',
+        'trend', 'volume_price_ratio',
+        'BB_MA', 'BB_UPPER', 'BB_LOWER',
+        'RSI',
+        'DOJI', 'HAMMER', 'SHOOTING_STAR'
+    ]
+    # Bougies précédentes nécessaires aux fenêtres glissantes (BB sur 20, RSI sur 14 variations)
+    LOOKBACK = 20
+
     @staticmethod
-    def process_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    def process_dataframe(df: pd.DataFrame, compact=False, dropna=True) -> pd.DataFrame:
+        """
+        Indicateurs et patterns d'un symbole.
+        compact : float32 pour les prix et indicateurs, int8 pour les drapeaux (voir schema.to_compact)
+        dropna : supprime les bougies dont les indicateurs ne sont pas encore définis
+        """
         # Conversion de base
         df['openTime'] = pd.to_datetime(df['openTime'], unit='ms')
         df['closeTime'] = pd.to_datetime(df['closeTime'], unit='ms')
+
+        # Tri chronologique : les fenêtres glissantes doivent porter sur le passé
+        df = df.sort_values('openTime').reset_index(drop=True)
         
         numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'quoteVolume']
         for col in numeric_cols:
@@ -77,7 +435,34 @@ class DataProcessor:
         df = TechnicalIndicators.calculate_bollinger_bands(df)
         df = TechnicalIndicators.calculate_rsi(df)
         
-        
+        df = DataProcessor.finalize(df, dropna)
+        return to_compact(df) if compact else df
+
+    @staticmethod
+    def process_chunks(chunks: Iterable[pd.DataFrame], compact=False) -> Iterator[pd.DataFrame]:
+        """
+        Traitement par blocs d'un historique chronologique (ex. pages de extract.iter_klines).
+        Les LOOKBACK dernières bougies brutes d'un bloc sont reprises en tête du suivant :
+        les blocs produits sont identiques au traitement de l'historique complet,
+        et la mémoire reste bornée par la taille d'un bloc.
+        """
+        carry = None
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+            frame = frame.sort_values('openTime', kind='stable')
+
+            df = DataProcessor.process_dataframe(frame.copy(), compact)
+            if carry is not None:
+                # Les bougies reprises ont déjà été produites avec le bloc précédent
+                df = df[df['openTime'] > pd.to_datetime(carry['openTime'], unit='ms').max()]
+            carry = frame.tail(DataProcessor.LOOKBACK)
+            yield df
+
+    @staticmethod
+    def finalize(df: pd.DataFrame, dropna=True) -> pd.DataFrame:
+        """Patterns, tendance et sélection des colonnes finales (indicateurs déjà calculés)"""
         # Ajout des patterns
         patterns = CandlePatterns(df)
         df = patterns.identify_patterns()
@@ -86,14 +471,6 @@ class DataProcessor:
         df['trend'] = (df['close'] > df['open']).astype(int).replace({0: -1, 1: 1})
         df['volume_price_ratio'] = (df['volume'] / df['close']).round(4)
 
-        # Colonnes finales
-        final_columns = [
-            'openTime', 'open', 'high', 'low', 'close', 'volume',
-            'trend', 'volume_price_ratio',
-            'BB_MA', 'BB_UPPER', 'BB_LOWER',
-            'RSI',
-            'DOJI', 'HAMMER', 'SHOOTING_STAR'
-        ]
-        df = df[final_columns].dropna()
-        return df
+        df = df[DataProcessor.FINAL_COLUMNS]
+        return df.dropna() if dropna else df
 
@@ -0,0 +1,126 @@
+"""
+Schéma par buckets de market_data : un document par (symbole, jour ou mois) contenant
+ses bougies en tableaux parallèles (openTime, OHLCV, indicateurs), complétés par $push.
+Une lecture sur un an de bougies 4h ramène une douzaine de documents au lieu de ~2 200.
+
+Le module ne dépend que de pandas/NumPy/pymongo pour être importé aussi bien par les
+scripts de src/ que par le dashboard (src.buckets).
+"""
+import datetime
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from pymongo import DeleteMany, UpdateOne
+
+BUCKET_COLLECTION = "market_data_buckets"
+# Tableaux d'un bucket (en plus de openTime) et leur type une fois décodés
+FIELD_DTYPES = {
+    'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64,
+    'volume': np.float64, 'trend': np.int64, 'volume_price_ratio': np.float64,
+    'BB_MA': np.float64, 'BB_UPPER': np.float64, 'BB_LOWER': np.float64, 'RSI': np.float64,
+    'DOJI': np.int64, 'HAMMER': np.int64, 'SHOOTING_STAR': np.int64,
+}
+BUCKET_FIELDS = list(FIELD_DTYPES)
+# Résolution NumPy du début d'un bucket
+PERIODS = {'day': 'datetime64[D]', 'month': 'datetime64[M]'}
+
+
+def bucket_start(open_times, period='month'):
+    """Début du bucket (jour ou mois) de chaque openTime"""
+    return np.asarray(open_times, dtype='datetime64[ms]').astype(PERIODS[period]).astype('datetime64[ms]')
+
+
+def _to_datetime(value):
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def trim_operations(symbol, since, period='month'):
+    """
+    Retire les bougies ouvertes à partir de `since` (ex. la bougie encore ouverte lors du
+    chargement précédent, rechargée ensuite) : les buckets qui commencent après sont
+    supprimés, celui qui contient `since` est tronqué.
+    """
+    bucket = _to_datetime(bucket_start([since], period)[0])
+    keep = {"$size": {"$filter": {"input": "$openTime", "cond": {"$lt": ["$$this", since]}}}}
+    return [
+        DeleteMany({"symbol": symbol, "bucket": {"$gte": bucket}, "first": {"$gte": since}}),
+        UpdateOne({"symbol": symbol, "bucket": bucket, "last": {"$gte": since}}, [
+            {"$set": {"count": keep}},
+            {"$set": {field: {"$slice": [f"${field}", "$count"]} for field in ['openTime', *BUCKET_FIELDS]}},
+            {"$set": {"last": {"$max": "$openTime"}}},
+        ]),
+    ]
+
+
+def append_operations(df, symbol, period='month', last_updated=None):
+    """
+    Ajoute ($push) les bougies traitées de `df` à la fin de leurs buckets, créés au besoin.
+    Les bougies doivent être postérieures à celles déjà stockées (voir trim_operations).
+    """
+    if df.empty:
+        return []
+    last_updated = datetime.datetime.now() if last_updated is None else last_updated
+    df = df.sort_values('openTime')
+    open_times = df['openTime'].to_numpy(dtype='datetime64[ms]')
+    buckets = bucket_start(open_times, period)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+
+    # Une liste de valeurs Python par colonne, découpée ensuite par bucket
+    columns = {'openTime': open_times.astype('datetime64[us]').tolist()}
+    columns.update((field, df[field].tolist()) for field in BUCKET_FIELDS)
+
+    operations = []
+    for start, end in zip(starts, ends):
+        operations.append(UpdateOne(
+            {"symbol": symbol, "bucket": _to_datetime(buckets[start])},
+            {
+                "$push": {field: {"$each": values[start:end]} for field, values in columns.items()},
+                "$inc": {"count": int(end - start)},
+                "$min": {"first": columns['openTime'][start]},
+                "$max": {"last": columns['openTime'][end - 1]},
+                "$set": {"last_updated": last_updated},
+                "$setOnInsert": {"period": period},
+            },
+            upsert=True
+        ))
+    return operations
+
+
+def latest_open_time(collection, symbol):
+    """openTime de la dernière bougie stockée d'un symbole, None s'il n'en a aucune"""
+    latest = collection.find_one({"symbol": symbol}, {"last": 1, "_id": 0}, sort=[("bucket", -1)])
+    return latest["last"] if latest else None
+
+
+def read_buckets(collection, symbol, start=None, end=None, fields=None):
+    """
+    Bougies d'un symbole entre `start` et `end` (inclus), décodées en colonnes NumPy
+    à partir des tableaux des buckets. Renvoie un DataFrame (openTime + champs).
+    """
+    fields = BUCKET_FIELDS if fields is None else list(fields)
+    query = {"symbol": symbol}
+    if start is not None:
+        query["last"] = {"$gte": start}
+    if end is not None:
+        query["first"] = {"$lte": end}
+    projection = {"_id": 0, "count": 1, "openTime": 1, **{field: 1 for field in fields}}
+    documents = list(collection.find(query, projection).sort("bucket", 1))
+
+    size = sum(document["count"] for document in documents)
+    df = pd.DataFrame({
+        'openTime': np.array(list(chain.from_iterable(document["openTime"] for document in documents)),
+                             dtype='datetime64[ms]'),
+        **{field: np.fromiter(chain.from_iterable(document[field] for document in documents),
+                              dtype=FIELD_DTYPES.get(field, np.float64), count=size)
+           for field in fields},
+    })
+
+    # Les buckets aux bornes dépassent de la période demandée
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= df['openTime'].to_numpy() >= np.datetime64(start, 'ms')
+    if end is not None:
+        mask &= df['openTime'].to_numpy() <= np.datetime64(end, 'ms')
+    return df if mask.all() else df[mask].reset_index(drop=True)
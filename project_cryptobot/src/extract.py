@@ -1,9 +1,13 @@
 import json
 import os
-import requests
+import numpy as np
+import pandas as pd
 import time
 from datetime import datetime, timedelta
+from queue import Full, Queue
+from threading import Event, Lock, Thread
 from dotenv import load_dotenv
+from http_client import get_client
 
 CONFIG_DIR = os.path.join(os.path.dirname(__file__), '../config/config.json')
 def load_config(CONFIG_DIR=CONFIG_DIR):
@@ -20,9 +24,135 @@ def load_config(CONFIG_DIR=CONFIG_DIR):
         
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found at {CONFIG_DIR}")
-    
-def fetch_data_klines(endpoint, symbol, interval, columns, limit, start_date=None, end_date=None):
+
+
+INTERVAL_UNITS_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+def interval_to_milliseconds(interval):
+    """
+    Converts a Binance kline interval to its duration in milliseconds.
+
+    Parameters:
+    ----------
+    Interval: str
+        Candle interval (e.g. "1s", "15m", "4h", "1d"). Monthly candles ("1M")
+        have no fixed duration and are rejected.
+
+    Returns:
+    -------
+    The interval duration in milliseconds.
+    """
+    unit = interval[-1]
+    if unit not in INTERVAL_UNITS_MS or not interval[:-1].isdigit():
+        raise ValueError(f"Unsupported interval: {interval}")
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[unit]
+
+# Kline columns decoded as int64, every other column is decoded as float64
+INTEGER_COLUMNS = ('openTime', 'closeTime', 'numTrades')
+TIME_COLUMNS = ('openTime', 'closeTime')
+
+class KlineColumns:
+    """
+    Columnar buffer decoding kline pages straight into typed NumPy arrays.
+
+    Each page returned by the klines endpoint (a list of lists) is written
+    into preallocated int64/float64 columns, without building a dictionary
+    per candle. Capacity doubles when a page does not fit.
+
+    Parameters:
+    ----------
+    Columns: list
+        Column names for klines data
+    Capacity: int
+        Number of rows preallocated.
+    """
+    def __init__(self, columns, capacity=1000):
+        self.columns = list(columns)
+        self.size = 0
+        self.arrays = {
+            name: np.empty(capacity, dtype=np.int64 if name in INTEGER_COLUMNS else np.float64)
+            for name in self.columns
+        }
+
+    def _reserve(self, n):
+        capacity = len(self.arrays[self.columns[0]])
+        if self.size + n <= capacity:
+            return
+        capacity = max(capacity * 2, self.size + n)
+        for name, array in self.arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+
+    def append(self, klines):
+        """Decodes one page of klines into the columns."""
+        n = len(klines)
+        if n == 0:
+            return
+        if len(klines[0]) != len(self.columns):
+            raise Exception(f"Column count mismatch: expected {len(self.columns)} columns, but the kline data has {len(klines[0])} items.")
+
+        self._reserve(n)
+        page = np.array(klines, dtype=object)
+        for i, name in enumerate(self.columns):
+            self.arrays[name][self.size:self.size + n] = page[:, i]
+        self.size += n
+
+    def to_frame(self):
+        """
+        Returns the decoded klines as a DataFrame sorted by ascending openTime.
+
+        Candles fetched twice (overlapping pages) are deduplicated on openTime,
+        keeping the latest version. openTime/closeTime are converted to datetimes.
+        """
+        open_time = self.arrays['openTime'][:self.size]
+        order = np.argsort(open_time, kind='stable')
+        sorted_time = open_time[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = sorted_time[1:] != sorted_time[:-1]
+        order = order[keep]
+
+        df = pd.DataFrame({name: self.arrays[name][:self.size][order] for name in self.columns})
+        for name in TIME_COLUMNS:
+            if name in df.columns:
+                df[name] = pd.to_datetime(df[name], unit='ms')
+        return df
+
+
+def fetch_data_klines(endpoint, symbol, interval, columns, limit, start_date=None, end_date=None, as_frame=False):
+    """
+    Fetches klines (candlestick data) from Binance, page by page.
+
+    Parameters:
+    ----------
+    Endpoint: str
+        API endpoint for candlestick data.
+    Symbol: str
+        Cryptocurrency pair (e.g. "BTCUSDT")
+    Interval: str
+        Candle interval (e.g. "4h")
+    Columns: list
+        Column names for klines data
+    Limit: int
+        1000 (maximum allowed.)
+    start_date, end_date: datetime
+        Range to fetch, from the earliest available data to now by default.
+    as_frame: bool
+        Decode pages into typed columns and return a DataFrame.
+
+    Returns:
+    -------
+    A list of dictionaries sorted by descending openTime, or with `as_frame`
+    a DataFrame sorted by ascending openTime (see `KlineColumns.to_frame`).
+    """
     data_klines = []
+    batch = KlineColumns(columns, capacity=limit) if as_frame else None
 
     if end_date is None:
         end_date = datetime.now()
@@ -35,7 +165,7 @@ def fetch_data_klines(endpoint, symbol, interval, columns, limit, start_date=Non
     params = {'symbol': symbol, 'interval': interval, 'limit': limit, 'startTime': start_timestamp, 'endTime': end_timestamp}
 
     while True:
-        response = requests.get(endpoint, params=params)
+        response = get_client().get(endpoint, params=params)
         
         if response.status_code != 200:
             raise Exception(f"Error: {response.status_code},{response.text}")
@@ -46,23 +176,131 @@ def fetch_data_klines(endpoint, symbol, interval, columns, limit, start_date=Non
             print("No more data returned, breaking the loop.")
             break
         
-        for kline in klines:
-            kline_dict = dict(zip(columns, kline))
-            data_klines.append(kline_dict)
+        if as_frame:
+            batch.append(klines)
+        else:
+            for kline in klines:
+                kline_dict = dict(zip(columns, kline))
+                data_klines.append(kline_dict)
         
         params['startTime'] = klines[-1][0] + 1
 
-        print(f"Fetched {len(data_klines)} rows for {symbol} from {start_date if start_date else 'earliest available'} to {end_date.strftime('%Y-%m-%d')}")
+        print(f"Fetched {batch.size if as_frame else len(data_klines)} rows for {symbol} from {start_date if start_date else 'earliest available'} to {end_date.strftime('%Y-%m-%d')}")
         if klines[-1][0] >= end_timestamp:
             print("Reached end date, breaking the loop.")
             break
         time.sleep(0.1)
 
+    if as_frame:
+        return batch.to_frame()
+
     data_klines.sort(key=lambda x: x['openTime'], reverse=True)
     
     return data_klines
   
 
+def iter_klines(endpoint, symbol, interval, columns, limit, start_date=None, end_date=None):
+    """
+    Fetches klines page by page, yielding each page as soon as it is decoded.
+
+    Same parameters as `fetch_data_klines`, but nothing is accumulated: the
+    caller handles one page (at most `limit` candles) at a time.
+
+    Returns:
+    -------
+    A generator of DataFrames sorted by ascending openTime (see `KlineColumns.to_frame`).
+    """
+    if end_date is None:
+        end_date = datetime.now()
+
+    end_timestamp = int(end_date.timestamp() * 1000)
+    start_timestamp = int(start_date.timestamp() * 1000) if start_date else 0
+
+    params = {'symbol': symbol, 'interval': interval, 'limit': limit, 'startTime': start_timestamp, 'endTime': end_timestamp}
+
+    while True:
+        response = get_client().get(endpoint, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code},{response.text}")
+
+        klines = response.json()
+        if not klines:
+            break
+
+        page = KlineColumns(columns, capacity=len(klines))
+        page.append(klines)
+        yield page.to_frame()
+
+        params['startTime'] = klines[-1][0] + 1
+        if klines[-1][0] >= end_timestamp:
+            break
+        time.sleep(0.1)
+
+
+def iter_prefetched(pages, max_pages=4):
+    """
+    Consumes an iterator in a background thread, keeping at most `max_pages` ahead.
+
+    Lets the next pages download while the caller processes and loads the
+    current one, with a bounded amount of memory. Exceptions raised by the
+    producer are re-raised in the caller. When the caller stops iterating,
+    the producer stops too and closes `pages`.
+    """
+    queue = Queue(maxsize=max_pages)
+    done = object()
+    stop = Event()
+
+    def put(item):
+        # A full queue is retried until the caller stops reading
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def producer():
+        try:
+            for page in pages:
+                if not put(page):
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(pages, 'close', None)
+            if close is not None:
+                close()
+            put(done)
+
+    Thread(target=producer, daemon=True).start()
+
+    try:
+        while True:
+            item = queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def fetch_first_open_time(endpoint, symbol, interval):
+    """
+    Returns the openTime (ms) of the first candle available for a symbol,
+    or None if the symbol has no candles.
+    """
+    params = {'symbol': symbol, 'interval': interval, 'limit': 1, 'startTime': 0}
+    response = get_client().get(endpoint, params=params)
+    if response.status_code != 200:
+        raise Exception(f"Error: {response.status_code},{response.text}")
+
+    klines = response.json()
+    return klines[0][0] if klines else None
+
+
 def fetch_data_ticker(endpoint, symbol):
       """ 
       Fetches ticker data from Binance (last 24hr).
@@ -80,7 +318,7 @@ def fetch_data_ticker(endpoint, symbol):
       """
       params = {'symbol': symbol}
       
-      response = requests.get(endpoint, params=params)
+      response = get_client().get(endpoint, params=params)
       if response.status_code != 200:
         raise Exception(f"Error: {response.status_code},{response.text}")
 
@@ -89,6 +327,54 @@ def fetch_data_ticker(endpoint, symbol):
       return ticker
 
 
+# Snapshot cache shared by every caller of the process (e.g. the /tickers route of the API)
+TICKER_TTL = 10
+_ticker_cache = {}
+_ticker_lock = Lock()
+
+def fetch_data_tickers(endpoint, symbols, ttl=TICKER_TTL):
+    """ 
+    Fetches 24hr ticker data for several symbols in a single request.
+
+    Uses the `symbols=["BTCUSDT","ETHUSDT",...]` form of the endpoint and
+    keeps the snapshot for `ttl` seconds, so repeated calls within that
+    delay do not hit the API.
+
+    Parameters:
+    ----------
+    Endpoint: str
+        API endpoint for ticker data.
+    Symbols: list
+        Cryptocurrency pairs (e.g. ["BTCUSDT", "ETHUSDT"])
+    ttl: float
+        Lifetime of the cached snapshot in seconds (0 disables the cache).
+
+    Returns:
+    -------
+    A DataFrame indexed by symbol, one numeric column per ticker field
+    (a copy of the cached snapshot, callers may modify it).
+    """
+    key = (endpoint, tuple(sorted(symbols)))
+    with _ticker_lock:
+        cached = _ticker_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1].copy()
+
+        params = {'symbols': json.dumps(list(symbols), separators=(',', ':'))}
+        response = get_client().get(endpoint, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code},{response.text}")
+
+        snapshot = pd.DataFrame.from_records(response.json()).set_index('symbol')
+        snapshot = snapshot.apply(pd.to_numeric, errors='coerce')
+        for name in ('openTime', 'closeTime'):
+            if name in snapshot.columns:
+                snapshot[name] = pd.to_datetime(snapshot[name], unit='ms')
+
+        _ticker_cache[key] = (time.monotonic(), snapshot)
+        return snapshot.copy()
+
+
 def fetch_data_trades(endpoint, symbol, columns, limit):
       """ 
       Fetches all aggregated trades data from Binance. 
@@ -111,7 +397,7 @@ def fetch_data_trades(endpoint, symbol, columns, limit):
       params = {'symbol': symbol, 
                 'limit': limit}
       
-      response = requests.get(endpoint, params=params)
+      response = get_client().get(endpoint, params=params)
       if response.status_code != 200:
         raise Exception(f"Error: {response.status_code},{response.text}")
 
@@ -122,7 +408,105 @@ def fetch_data_trades(endpoint, symbol, columns, limit):
         if len(trade) != len(columns):
             raise Exception(f"Column count mismatch: expected {len(columns)} columns, but the trade data has {len(trade)} items.")
         
-        trade_dict = {columns[i]: trade[list(trade.keys())[i]] for i in range(len(columns))}
+        trade_dict = dict(zip(columns, trade.values()))
         data_trades.append(trade_dict)
     
       return data_trades
+
+
+# Aggregated trade fields returned by /api/v3/aggTrades, in order
+AGG_TRADE_FIELDS = ('a', 'p', 'q', 'f', 'l', 'T', 'm', 'M')
+AGG_TRADE_DTYPES = (np.int64, np.float64, np.float64, np.int64, np.int64, np.int64, np.bool_, np.bool_)
+
+def decode_agg_trades(trades, columns):
+    """
+    Decodes a page of aggregated trades into typed NumPy columns.
+
+    Parameters:
+    ----------
+    Trades: list
+        Aggregated trades as returned by Binance (dictionaries keyed a, p, q, f, l, T, m, M).
+    Columns: list
+        Column names for aggregated trades data, in the same order.
+
+    Returns:
+    -------
+    A dictionary column name -> NumPy array.
+    """
+    if len(columns) != len(AGG_TRADE_FIELDS):
+        raise Exception(f"Column count mismatch: expected {len(AGG_TRADE_FIELDS)} columns, got {len(columns)}.")
+
+    page = np.array([[trade[field] for field in AGG_TRADE_FIELDS] for trade in trades], dtype=object)
+    page = page.reshape(len(trades), len(AGG_TRADE_FIELDS))
+    return {name: page[:, i].astype(dtype) for i, (name, dtype) in enumerate(zip(columns, AGG_TRADE_DTYPES))}
+
+
+def fetch_agg_trades(endpoint, symbol, columns, limit, from_id=None, start_date=None, end_date=None, max_pages=None):
+    """
+    Fetches aggregated trades from Binance, walking pages with `fromId`.
+
+    Parameters:
+    ----------
+    Endpoint: str
+        API endpoint for aggregated trades data.
+    Symbol: str
+        Cryptocurrency pair (e.g. "BTCUSDT")
+    Columns: list
+        Column names for aggregated trades data
+    Limit: int
+        1000 (maximum allowed.)
+    from_id: int
+        First aggregated trade id to fetch.
+    start_date: datetime
+        Start of the range when `from_id` is not known.
+    end_date: datetime
+        End of the range, now by default.
+    max_pages: int
+        Optional cap on the number of requests.
+
+    Returns:
+    -------
+    A dictionary column name -> NumPy array, sorted by trade id.
+    """
+    if from_id is None and start_date is None:
+        raise ValueError("Either from_id or start_date is required to page aggregated trades.")
+    if end_date is None:
+        end_date = datetime.now()
+    end_timestamp = int(end_date.timestamp() * 1000)
+    time_column = columns[AGG_TRADE_FIELDS.index('T')]
+    id_column = columns[AGG_TRADE_FIELDS.index('a')]
+
+    params = {'symbol': symbol, 'limit': limit}
+    if from_id is not None:
+        params['fromId'] = from_id
+    else:
+        params['startTime'] = int(start_date.timestamp() * 1000)
+
+    pages = []
+    while max_pages is None or len(pages) < max_pages:
+        response = get_client().get(endpoint, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Error: {response.status_code},{response.text}")
+
+        trades = response.json()
+        if not trades:
+            break
+
+        page = decode_agg_trades(trades, columns)
+        pages.append(page)
+
+        last_time = page[time_column][-1]
+        if last_time >= end_timestamp or len(trades) < limit:
+            break
+
+        params.pop('startTime', None)
+        params['fromId'] = int(page[id_column][-1]) + 1
+        time.sleep(0.1)
+
+    if not pages:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in zip(columns, AGG_TRADE_DTYPES)}
+
+    data = {name: np.concatenate([page[name] for page in pages]) for name in columns}
+    in_range = data[time_column] <= end_timestamp
+    print(f"Fetched {int(in_range.sum())} aggregated trades for {symbol}")
+    return {name: values[in_range] for name, values in data.items()}
@@ -0,0 +1,341 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import aiohttp
+
+from extract import INTERVAL_UNITS_MS, KlineColumns, interval_to_milliseconds
+from http_client import get_client
+
+# Binance spot limits: REQUEST_WEIGHT is counted per IP over a one-minute window.
+WEIGHT_LIMIT_1M = 6000
+KLINES_WEIGHT = 2
+MAX_RETRIES = 5
+
+
+class WeightBudget:
+    """
+    Request-weight budget shared by every coroutine talking to Binance.
+
+    The budget reserves weight before each request and is corrected with the
+    `X-MBX-USED-WEIGHT-1M` header returned by the exchange, so concurrent
+    symbols never push the IP over the limit. A 429/418 answer blocks every
+    caller until the `Retry-After` delay has elapsed.
+
+    Parameters:
+    ----------
+    limit: int
+        Weight allowed per minute (6000 on Binance spot).
+    safety: float
+        Fraction of the limit we allow ourselves to use.
+    """
+    def __init__(self, limit=WEIGHT_LIMIT_1M, safety=0.9):
+        self.limit = limit
+        self.threshold = int(limit * safety)
+        self.used = 0
+        self.window = self._current_window()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _current_window():
+        return int(time.time() // 60)
+
+    def _roll_window(self):
+        window = self._current_window()
+        if window != self.window:
+            self.window = window
+            self.used = 0
+
+    async def acquire(self, weight):
+        """Waits until `weight` can be spent without exceeding the budget."""
+        async with self._lock:
+            while True:
+                now = time.time()
+                if self.blocked_until > now:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._roll_window()
+                if self.used + weight <= self.threshold:
+                    self.used += weight
+                    return
+                # Budget exhausted: wait for the next minute window
+                await asyncio.sleep((self.window + 1) * 60 - now)
+
+    def update(self, headers):
+        """Synchronises the local counter with the weight reported by Binance."""
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("X-MBX-USED-WEIGHT")
+        if used is not None:
+            self._roll_window()
+            self.used = max(self.used, int(used))
+
+    def block(self, seconds):
+        """Blocks every caller for `seconds` (429/418 back-off)."""
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+
+def _retry_after(response, attempt):
+    """Delay requested by Binance, or an exponential back-off with jitter."""
+    header = response.headers.get("Retry-After")
+    if header is not None:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    return min(60, 2 ** attempt) + random.uniform(0, 1)
+
+
+async def request_json(session, budget, endpoint, params, weight=KLINES_WEIGHT, max_retries=MAX_RETRIES):
+    """
+    Performs a GET request through the shared weight budget.
+
+    Parameters:
+    ----------
+    session: aiohttp.ClientSession
+        Session shared by all the coroutines.
+    budget: WeightBudget
+        Shared request-weight budget.
+    endpoint: str
+        API endpoint.
+    params: dict
+        Query parameters.
+    weight: int
+        Request weight of the endpoint.
+
+    Returns:
+    -------
+    The decoded JSON payload.
+
+    Every attempt is recorded in the statistics of the shared HttpClient.
+    """
+    client = get_client()
+    for attempt in range(max_retries + 1):
+        await budget.acquire(weight)
+        start = time.perf_counter()
+        try:
+            response = await session.get(endpoint, params=params)
+        except aiohttp.ClientError:
+            client.record(endpoint, time.perf_counter() - start, error=True)
+            raise
+        async with response:
+            budget.update(response.headers)
+
+            if response.status == 200:
+                payload = await response.json()
+                client.record(endpoint, time.perf_counter() - start)
+                return payload
+
+            text = await response.text()
+            # 429: rate limit hit, 418: IP banned after ignoring 429s
+            retry = response.status in (429, 418) and attempt < max_retries
+            client.record(endpoint, time.perf_counter() - start, error=True, retry=retry)
+            if retry:
+                delay = _retry_after(response, attempt)
+                print(f"Rate limited ({response.status}), backing off {delay:.1f}s")
+                budget.block(delay)
+                continue
+
+            raise Exception(f"Error: {response.status},{text}")
+
+    raise Exception(f"Error: rate limit retries exhausted for {endpoint}")
+
+
+async def fetch_data_klines_async(session, budget, endpoint, symbol, interval, columns, limit, start_date=None, end_date=None, as_frame=False):
+    """
+    Asynchronous counterpart of `extract.fetch_data_klines`.
+
+    Returns:
+    -------
+    A list of dictionaries with kline data sorted by descending openTime,
+    or a DataFrame sorted by ascending openTime with `as_frame`.
+    """
+    data_klines = []
+    batch = KlineColumns(columns, capacity=limit) if as_frame else None
+
+    if end_date is None:
+        end_date = datetime.now()
+
+    end_timestamp = int(end_date.timestamp() * 1000)
+    start_timestamp = int(start_date.timestamp() * 1000) if start_date else 0
+
+    params = {'symbol': symbol, 'interval': interval, 'limit': limit, 'startTime': start_timestamp, 'endTime': end_timestamp}
+
+    while True:
+        klines = await request_json(session, budget, endpoint, dict(params))
+
+        if not klines:
+            break
+
+        if as_frame:
+            batch.append(klines)
+        else:
+            for kline in klines:
+                data_klines.append(dict(zip(columns, kline)))
+
+        params['startTime'] = klines[-1][0] + 1
+
+        if klines[-1][0] >= end_timestamp:
+            break
+
+    if as_frame:
+        print(f"Fetched {batch.size} rows for {symbol}")
+        return batch.to_frame()
+
+    print(f"Fetched {len(data_klines)} rows for {symbol}")
+    data_klines.sort(key=lambda x: x['openTime'], reverse=True)
+
+    return data_klines
+
+
+def kline_windows(start_timestamp, end_timestamp, interval, limit):
+    """
+    Splits [start_timestamp, end_timestamp] into windows of `limit` candles.
+
+    Windows start on candle boundaries (weekly candles open on Monday) so each
+    one maps to exactly one full page of the klines endpoint.
+
+    Parameters:
+    ----------
+    start_timestamp, end_timestamp: int
+        Range bounds in milliseconds.
+    Interval: str
+        Fixed-duration candle interval (e.g. "1h", "4h").
+    Limit: int
+        Candles per window (1000 maximum).
+
+    Returns:
+    -------
+    A list of (startTime, endTime) tuples in milliseconds.
+    """
+    interval_ms = interval_to_milliseconds(interval)
+    # 1970-01-01 is a Thursday, Binance weekly candles open on Mondays
+    offset = 4 * INTERVAL_UNITS_MS['d'] if interval.endswith('w') else 0
+    first = start_timestamp - (start_timestamp - offset) % interval_ms
+    step = interval_ms * limit
+
+    return [(window_start, min(window_start + step - 1, end_timestamp))
+            for window_start in range(first, end_timestamp + 1, step)]
+
+
+async def fetch_data_klines_sharded_async(session, budget, endpoint, symbol, interval, columns, limit, start_date=None, end_date=None, max_concurrency=10, as_frame=False):
+    """
+    Backfills klines by fetching precomputed time windows concurrently.
+
+    Unlike `fetch_data_klines_async`, the pages do not depend on each other:
+    [start_date, end_date] is split with `kline_windows` and every window is
+    requested at the same time (bounded by `max_concurrency`). Pages are
+    stitched back together with deduplication on openTime.
+
+    Returns:
+    -------
+    A list of dictionaries with kline data sorted by descending openTime,
+    or a DataFrame sorted by ascending openTime with `as_frame`.
+    """
+    if end_date is None:
+        end_date = datetime.now()
+
+    end_timestamp = int(end_date.timestamp() * 1000)
+
+    if start_date is None:
+        # Locate the first available candle to know where the history starts
+        first = await request_json(session, budget, endpoint,
+                                   {'symbol': symbol, 'interval': interval, 'limit': 1, 'startTime': 0})
+        if not first:
+            return KlineColumns(columns).to_frame() if as_frame else []
+        start_timestamp = first[0][0]
+    else:
+        start_timestamp = int(start_date.timestamp() * 1000)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_window(window_start, window_end):
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit,
+                  'startTime': window_start, 'endTime': window_end}
+        async with semaphore:
+            return await request_json(session, budget, endpoint, params)
+
+    windows = kline_windows(start_timestamp, end_timestamp, interval, limit)
+    pages = await asyncio.gather(*(fetch_window(*window) for window in windows))
+
+    if as_frame:
+        batch = KlineColumns(columns, capacity=max(1, sum(len(klines) for klines in pages)))
+        for klines in pages:
+            batch.append(klines)
+        df = batch.to_frame()
+        print(f"Fetched {len(df)} rows for {symbol} in {len(windows)} windows")
+        return df
+
+    klines_by_time = {}
+    for klines in pages:
+        for kline in klines:
+            klines_by_time[kline[0]] = kline
+
+    data_klines = [dict(zip(columns, klines_by_time[open_time]))
+                   for open_time in sorted(klines_by_time, reverse=True)]
+
+    print(f"Fetched {len(data_klines)} rows for {symbol} in {len(windows)} windows")
+    return data_klines
+
+
+async def fetch_all_klines_async(endpoint, symbols, interval, columns, limit, start_date=None, end_date=None, max_connections=20, budget=None, start_dates=None, backfill=False, as_frame=False):
+    """
+    Fetches klines for every symbol concurrently.
+
+    `start_dates` (symbol -> datetime) overrides `start_date` per symbol.
+    With `backfill`, each symbol's range is also split into windows fetched
+    in parallel (see `fetch_data_klines_sharded_async`).
+
+    Returns:
+    -------
+    A dictionary symbol -> list of klines, or the exception raised for that symbol.
+    """
+    budget = budget or WeightBudget()
+    start_dates = start_dates or {}
+    connector = aiohttp.TCPConnector(limit=max_connections)
+    fetch = fetch_data_klines_sharded_async if backfill else fetch_data_klines_async
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [
+            fetch(session, budget, endpoint, symbol, interval, columns, limit,
+                                    start_dates.get(symbol, start_date), end_date, as_frame=as_frame)
+            for symbol in symbols
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    return dict(zip(symbols, results))
+
+
+def fetch_all_klines(endpoint, symbols, interval, columns, limit, start_date=None, end_date=None, max_connections=20, start_dates=None, backfill=False, as_frame=False):
+    """
+    Fetches klines for all the symbols at the same time.
+
+    Parameters:
+    ----------
+    Endpoint: str
+        API endpoint for candlestick data.
+    Symbols: list
+        Cryptocurrency pairs (e.g. ["BTCUSDT", "ETHUSDT"])
+    Interval: str
+        Candle interval (e.g. "4h")
+    Columns: list
+        Column names for klines data
+    Limit: int
+        1000 (maximum allowed.)
+    max_connections: int
+        Maximum number of simultaneous HTTP connections.
+    start_dates: dict
+        Optional per-symbol start dates (e.g. incremental watermarks).
+    backfill: bool
+        Split each symbol's range into windows fetched concurrently.
+    as_frame: bool
+        Decode klines into typed columns and return DataFrames.
+
+    Returns:
+    -------
+    A dictionary symbol -> list of klines or DataFrame (or the exception raised for it).
+    """
+    return asyncio.run(
+        fetch_all_klines_async(endpoint, symbols, interval, columns, limit, start_date, end_date, max_connections,
+                               start_dates=start_dates, backfill=backfill, as_frame=as_frame)
+    )
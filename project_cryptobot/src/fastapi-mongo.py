@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from models import MarketData, UpdateMarketData,PredictionRequest
 from predictions import load_data, load_scalers, make_pred 
+from extract import fetch_data_tickers, load_config
 from prometheus_client import Counter, REGISTRY, generate_latest, CollectorRegistry, multiprocess
 from prometheus_fastapi_instrumentator import Instrumentator
 from bson import ObjectId
@@ -178,6 +179,16 @@ async def delete_market_data(item_id: str):
         raise HTTPException(status_code=404, detail="Market data not found")
     return document_to_dict(deleted_doc)
 
+# 24hr tickers of the configured symbols, one Binance request per TICKER_TTL shared by all the callers
+@app.get("/tickers", response_model=List[dict])
+def get_tickers():
+    try:
+        config = load_config()
+        snapshot = fetch_data_tickers(config["api_endpoints"]["binance_ticker"], config["symbols"])
+        return json.loads(snapshot.reset_index().to_json(orient="records", date_format="iso"))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 ## Collection ML Prediction
 async def save_data(symbol, future_pred):
     # Prediction Counter
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses worth retrying: rate limits (429/418) and transient server errors
+RETRY_STATUSES = (418, 429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the Binance REST calls.
+
+    Wraps a pooled `requests.Session` (keep-alive connections reused across
+    pages and symbols, gzip responses), retries transient failures with a
+    jittered exponential back-off honouring `Retry-After`, and records the
+    latency of every request per endpoint.
+
+    Parameters:
+    ----------
+    pool_size: int
+        Connections kept alive per host.
+    max_retries: int
+        Retries after the first attempt.
+    backoff: float
+        Base delay in seconds of the exponential back-off.
+    max_backoff: float
+        Upper bound of a single back-off delay in seconds.
+    timeout: float
+        Connect/read timeout in seconds.
+    """
+    def __init__(self, pool_size=20, max_retries=3, backoff=0.5, max_backoff=30, timeout=10):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+        self._latencies = defaultdict(lambda: deque(maxlen=1000))
+        self._counts = defaultdict(lambda: {'requests': 0, 'errors': 0, 'retries': 0})
+        self._lock = threading.Lock()
+
+    def _sleep_before_retry(self, attempt, retry_after=None):
+        # Full jitter: spreads the retries of concurrent callers
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def record(self, endpoint, elapsed, error=False, retry=False):
+        """
+        Records one request in the endpoint statistics, also used by the requests
+        sent outside of the session (see extract_async.request_json).
+        """
+        with self._lock:
+            counts = self._counts[endpoint]
+            counts['requests'] += 1
+            counts['errors'] += int(error)
+            counts['retries'] += int(retry)
+            self._latencies[endpoint].append(elapsed)
+
+    def get(self, endpoint, params=None):
+        """
+        Sends a GET request, retrying connection errors and retryable statuses.
+
+        Returns:
+        -------
+        The `requests.Response` of the last attempt.
+        """
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(endpoint, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.record(endpoint, time.perf_counter() - start, error=True, retry=attempt < self.max_retries)
+                if attempt == self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+
+            retry = response.status_code in RETRY_STATUSES and attempt < self.max_retries
+            self.record(endpoint, time.perf_counter() - start,
+                         error=response.status_code != 200, retry=retry)
+            if not retry:
+                return response
+
+            print(f"Retrying {endpoint} after status {response.status_code}")
+            self._sleep_before_retry(attempt, response.headers.get('Retry-After'))
+
+    def stats(self):
+        """
+        Per-endpoint request counts and latency percentiles (milliseconds).
+
+        Returns:
+        -------
+        A dictionary endpoint -> statistics.
+        """
+        with self._lock:
+            stats = {}
+            for endpoint, latencies in self._latencies.items():
+                ms = np.array(latencies) * 1000
+                stats[endpoint] = {
+                    **self._counts[endpoint],
+                    'mean_ms': round(float(ms.mean()), 2),
+                    'p50_ms': round(float(np.percentile(ms, 50)), 2),
+                    'p95_ms': round(float(np.percentile(ms, 95)), 2),
+                    'max_ms': round(float(ms.max()), 2),
+                }
+            return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def configure_client(**settings):
+    """Replaces the shared client with one built from `settings` (see `HttpClient`)."""
+    global _client
+    with _client_lock:
+        _client = HttpClient(**settings)
+    return _client
+
+
+def get_client():
+    """Returns the process-wide `HttpClient`, created on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,300 @@
+"""
+Noyaux de calcul des indicateurs techniques, partagés par l'ETL (Data_processor)
+et le dashboard (crypto_analysis).
+
+Les fonctions prennent et renvoient des tableaux NumPy (1-D, ou 2-D temps × symbole
+pour les fenêtres glissantes). Chaque fenêtre est sommée dans le même ordre quel que
+soit le début de la série : un calcul complet, incrémental ou par blocs donne
+exactement les mêmes valeurs, arrondis compris. Numba est utilisé s'il est installé,
+avec le même ordre de calcul.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _rolling_sum_numpy(filled, observed, n):
+    padding = np.zeros((n - 1,) + filled.shape[1:])
+    filled = np.concatenate([padding, filled])
+    observed = np.concatenate([padding, observed])
+    length = len(filled)
+
+    total = filled[n - 1:].copy()
+    count = observed[n - 1:].copy()
+    for k in range(1, n):
+        total += filled[n - 1 - k:length - k]
+        count += observed[n - 1 - k:length - k]
+    return total, count
+
+
+def _rolling_sum_loop(filled, observed, n):
+    total = np.zeros_like(filled)
+    count = np.zeros_like(filled)
+    for t in range(len(filled)):
+        s = 0.0
+        c = 0.0
+        for k in range(min(n, t + 1)):
+            s += filled[t - k]
+            c += observed[t - k]
+        total[t] = s
+        count[t] = c
+    return total, count
+
+
+def _ema_loop(values, alpha):
+    # Même récurrence que pandas ewm(adjust=False, ignore_na=False) : le poids de
+    # la moyenne précédente décroît aussi sur les NaN
+    out = np.full_like(values, np.nan)
+    old_weight = 1.0
+    weighted = np.nan
+    for t in range(len(values)):
+        x = values[t]
+        if np.isnan(weighted):
+            weighted = x
+        else:
+            old_weight *= 1.0 - alpha
+            if not np.isnan(x):
+                if weighted != x:
+                    weighted = (old_weight * weighted + alpha * x) / (old_weight + alpha)
+                old_weight = 1.0
+        out[t] = weighted
+    return out
+
+
+def _wilder_loop(values, n):
+    out = np.full_like(values, np.nan)
+    if len(values) < n:
+        return out
+    avg = 0.0
+    for k in range(n):
+        avg += values[k]
+    avg /= n
+    out[n - 1] = avg
+    for t in range(n, len(values)):
+        avg = (avg * (n - 1) + values[t]) / n
+        out[t] = avg
+    return out
+
+
+if njit is not None:
+    _rolling_sum_loop = njit(_rolling_sum_loop)
+    _ema_loop = njit(_ema_loop)
+    _wilder_loop = njit(_wilder_loop)
+
+
+def rolling_sum(values, n, min_periods=None):
+    """
+    Somme glissante sur n lignes (axe 0) et nombre de valeurs observées.
+    Les NaN sont ignorés ; la somme vaut NaN si moins de min_periods valeurs (n par défaut).
+    """
+    values = np.asarray(values, dtype=float)
+    min_periods = n if min_periods is None else min_periods
+    observed = ~np.isnan(values)
+    filled = np.where(observed, values, 0.0)
+
+    if njit is not None and values.ndim == 1:
+        total, count = _rolling_sum_loop(filled, observed.astype(float), n)
+    else:
+        total, count = _rolling_sum_numpy(filled, observed.astype(float), n)
+    total[count < max(min_periods, 1)] = np.nan
+    return total, count
+
+
+def rolling_mean(values, n, min_periods=None):
+    """Moyenne glissante sur n lignes (équivalent de pandas rolling(n, min_periods).mean())"""
+    total, count = rolling_sum(values, n, min_periods)
+    with np.errstate(invalid='ignore'):
+        return total / count
+
+
+def rolling_std(values, n, ddof=1):
+    """Écart-type glissant sur n lignes, calculé en deux passes autour de la moyenne"""
+    values = np.asarray(values, dtype=float)
+    mean = rolling_mean(values, n)
+    out = np.full_like(values, np.nan)
+    if len(values) >= n:
+        total = np.zeros_like(values[n - 1:])
+        for k in range(n):
+            total += (values[n - 1 - k:len(values) - k] - mean[n - 1:]) ** 2
+        out[n - 1:] = np.sqrt(total / (n - ddof))
+    return out
+
+
+def _rolling_extreme(values, n, reducer):
+    values = np.asarray(values, dtype=float)
+    out = np.full_like(values, np.nan)
+    if len(values) >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(values, n, axis=0)
+        out[n - 1:] = reducer(windows, axis=-1)
+    return out
+
+
+def rolling_min(values, n):
+    """Minimum glissant sur n lignes"""
+    return _rolling_extreme(values, n, np.min)
+
+
+def rolling_max(values, n):
+    """Maximum glissant sur n lignes"""
+    return _rolling_extreme(values, n, np.max)
+
+
+def ema(values, span):
+    """Moyenne mobile exponentielle (pandas ewm(span, adjust=False)), 1-D"""
+    values = np.asarray(values, dtype=float)
+    return _ema_loop(values, 2.0 / (span + 1.0))
+
+
+def wilder_mean(values, n):
+    """Moyenne lissée de Wilder : moyenne simple des n premières valeurs puis lissage 1/n, 1-D"""
+    values = np.asarray(values, dtype=float)
+    return _wilder_loop(values, n)
+
+
+def bollinger_bands(high, low, close, n=20, s=2, decimals=2, bands_from_rounded_ma=True):
+    """
+    Bandes de Bollinger sur le prix typique.
+    bands_from_rounded_ma : les bandes partent de la moyenne déjà arrondie (ETL)
+    ou de la moyenne exacte (dashboard).
+    Renvoie (BB_MA, BB_UPPER, BB_LOWER).
+    """
+    typical_price = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+    return bollinger_from_typical(typical_price, n, s, decimals, bands_from_rounded_ma)
+
+
+def bollinger_from_typical(typical_price, n=20, s=2, decimals=2, bands_from_rounded_ma=True):
+    """Bandes de Bollinger à partir du prix typique (voir bollinger_bands)"""
+    mean = rolling_mean(typical_price, n)
+    stddev = rolling_std(typical_price, n)
+
+    ma = np.round(mean, decimals)
+    center = ma if bands_from_rounded_ma else mean
+    upper = np.round(center + stddev * s, decimals)
+    lower = np.round(center - stddev * s, decimals)
+    return ma, upper, lower
+
+
+def gains_losses(close, decimals=2):
+    """Hausses et baisses arrondies de la clôture ; la première bougie compte pour 0"""
+    close = np.asarray(close, dtype=float)
+    delta = np.full_like(close, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    with np.errstate(invalid='ignore'):
+        gain = np.round(np.where(delta > 0, delta, 0), decimals)
+        loss = np.round(-np.where(delta < 0, delta, 0), decimals)
+    return gain, loss
+
+
+def rsi_from_averages(avg_gain, avg_loss, decimals=2):
+    """RSI à partir des moyennes de hausses et de baisses"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.asarray(avg_gain, dtype=float) / np.asarray(avg_loss, dtype=float)
+        return np.round(100 - (100 / (1 + rs)), decimals)
+
+
+def rsi(close, n=14, decimals=2, min_periods=None, method='simple'):
+    """
+    RSI sur n périodes.
+    method : 'simple' (moyennes glissantes, comme l'ETL) ou 'wilder' (lissage de Wilder).
+    """
+    gain, loss = gains_losses(close, decimals)
+    if method == 'wilder':
+        return rsi_from_averages(wilder_mean(gain, n), wilder_mean(loss, n), decimals)
+    if method != 'simple':
+        raise ValueError(f"Unsupported RSI method: {method}")
+    return rsi_from_averages(rolling_mean(gain, n, min_periods), rolling_mean(loss, n, min_periods), decimals)
+
+
+def macd(close, fast=12, slow=26, signal=9, decimals=2):
+    """MACD : renvoie (MACD_LINE, MACD_SIGNAL, MACD_HIST), le signal portant sur la ligne arrondie"""
+    line = np.round(ema(close, fast) - ema(close, slow), decimals)
+    signal_line = np.round(ema(line, signal), decimals)
+    return line, signal_line, np.round(line - signal_line, decimals)
+
+
+def stochastic(high, low, close, k_period=14, d_period=3, decimals=2):
+    """Oscillateur stochastique : renvoie (STOCH_K, STOCH_D)"""
+    lowest_low = rolling_min(low, k_period)
+    highest_high = rolling_max(high, k_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.round((np.asarray(close, dtype=float) - lowest_low) / (highest_high - lowest_low) * 100, decimals)
+    d = np.round(rolling_mean(k, d_period), decimals)
+    return k, d
+
+
+def candle_properties(open_, high, low, close, decimals=2):
+    """Propriétés de base des bougies : (body_size, upper_shadow, lower_shadow, candle_size)"""
+    open_, high, low, close = (np.asarray(values, dtype=float) for values in (open_, high, low, close))
+    body_size = np.round(np.abs(close - open_), decimals)
+    upper_shadow = np.round(high - np.fmax(open_, close), decimals)
+    lower_shadow = np.round(np.fmin(open_, close) - low, decimals)
+    candle_size = np.round(high - low, decimals)
+    return body_size, upper_shadow, lower_shadow, candle_size
+
+
+def candle_patterns(body_size, upper_shadow, lower_shadow, candle_size):
+    """Patterns de chandelier (0/1) : renvoie (DOJI, HAMMER, SHOOTING_STAR)"""
+    with np.errstate(invalid='ignore'):
+        doji = body_size <= candle_size * 0.1
+        hammer = (lower_shadow > body_size * 2) & (upper_shadow <= body_size * 0.5)
+        shooting_star = (upper_shadow > body_size * 2) & (lower_shadow <= body_size * 0.5)
+    return doji.astype(int), hammer.astype(int), shooting_star.astype(int)
+
+
+MULTI_CANDLE_PATTERNS = [
+    'BULLISH_ENGULFING', 'BEARISH_ENGULFING', 'BULLISH_HARAMI', 'BEARISH_HARAMI',
+    'MORNING_STAR', 'EVENING_STAR', 'THREE_WHITE_SOLDIERS', 'THREE_BLACK_CROWS'
+]
+
+
+def _previous(values, k, fill=np.nan):
+    """Valeurs k bougies plus tôt (axe 0), `fill` pour les k premières"""
+    shifted = np.full_like(values, fill)
+    shifted[k:] = values[:max(len(values) - k, 0)]
+    return shifted
+
+
+def multi_candle_patterns(open_, high, low, close, star_body=0.3):
+    """
+    Patterns sur deux ou trois bougies, marqués sur la dernière bougie du pattern.
+    Renvoie un dictionnaire nom -> tableau booléen (mêmes dimensions que close).
+    Une bougie manquante (NaN) ne fait partie d'aucun pattern.
+    """
+    open_, high, low, close = (np.asarray(values, dtype=float) for values in (open_, high, low, close))
+    o1, c1 = _previous(open_, 1), _previous(close, 1)
+    o2, c2 = _previous(open_, 2), _previous(close, 2)
+    body, body1, body2 = close - open_, c1 - o1, c2 - o2
+    top, top1, top2 = np.fmax(open_, close), np.fmax(o1, c1), np.fmax(o2, c2)
+    bottom, bottom1, bottom2 = np.fmin(open_, close), np.fmin(o1, c1), np.fmin(o2, c2)
+
+    with np.errstate(invalid='ignore'):
+        up, up1, up2 = body > 0, body1 > 0, body2 > 0
+        down, down1, down2 = body < 0, body1 < 0, body2 < 0
+        # Corps de la bougie courante contenant / contenu dans celui de la précédente
+        # (bornes incluses : une bougie crypto ouvre en général à la clôture précédente)
+        engulfs = (top >= top1) & (bottom <= bottom1) & (np.abs(body) > np.abs(body1))
+        inside = (top <= top1) & (bottom >= bottom1) & (np.abs(body) < np.abs(body1))
+        # Étoile : petit corps au-delà de la clôture de la première bougie
+        star = np.abs(body1) <= star_body * np.abs(body2)
+        midpoint2 = (o2 + c2) / 2
+        # Soldats / corbeaux : chaque bougie ouvre dans le corps de la précédente
+        # et clôture près de son extrême (ombre plus petite que le corps)
+        opens_inside = (open_ >= bottom1) & (open_ <= top1) & (o1 >= bottom2) & (o1 <= top2)
+        near_high = high - close < np.abs(body)
+        near_low = close - low < np.abs(body)
+        near_high = near_high & _previous(near_high, 1, False) & _previous(near_high, 2, False)
+        near_low = near_low & _previous(near_low, 1, False) & _previous(near_low, 2, False)
+
+        return {
+            'BULLISH_ENGULFING': down1 & up & engulfs,
+            'BEARISH_ENGULFING': up1 & down & engulfs,
+            'BULLISH_HARAMI': down1 & up & inside,
+            'BEARISH_HARAMI': up1 & down & inside,
+            'MORNING_STAR': down2 & star & (top1 <= c2) & up & (close > midpoint2),
+            'EVENING_STAR': up2 & star & (bottom1 >= c2) & down & (close < midpoint2),
+            'THREE_WHITE_SOLDIERS': up2 & up1 & up & (c1 > c2) & (close > c1) & opens_inside & near_high,
+            'THREE_BLACK_CROWS': down2 & down1 & down & (c1 < c2) & (close < c1) & opens_inside & near_low,
+        }
@@ -1,8 +1,45 @@
 import os
+import json
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from dotenv import load_dotenv
 
-def setup_mongodb_indexes(db):
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '../config/config.json')
+# Durée de conservation des bougies de market_data (7 jours)
+MARKET_DATA_TTL = 604800
+
+def timeseries_options(interval):
+    """Options d'une collection time-series de bougies, granularité selon l'unité de l'intervalle"""
+    granularity = {"s": "seconds", "m": "minutes"}.get(interval[-1], "hours")
+    return {"timeField": "openTime", "metaField": "symbol", "granularity": granularity}
+
+def create_market_data_timeseries(db, interval):
+    """Crée market_data comme collection time-series (les bougies sont regroupées par symbole)"""
+    if "market_data" in db.list_collection_names():
+        options = db.command("listCollections", filter={"name": "market_data"})["cursor"]["firstBatch"][0]
+        if options.get("type") != "timeseries":
+            print("market_data existe déjà comme collection classique : à supprimer pour passer en time-series")
+        else:
+            print("Collection time-series market_data existe déjà")
+        return
+    db.create_collection("market_data", timeseries=timeseries_options(interval),
+                         expireAfterSeconds=MARKET_DATA_TTL)
+    print(f"Collection time-series market_data créée ({timeseries_options(interval)['granularity']})")
+
+def remove_duplicate_candles(collection):
+    """Supprime les doublons (symbol, openTime) en gardant la version la plus récente"""
+    duplicates = collection.aggregate([
+        {"$sort": {"last_updated": -1}},
+        {"$group": {"_id": {"symbol": "$symbol", "openTime": "$openTime"},
+                    "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+
+    removed = 0
+    for duplicate in duplicates:
+        removed += collection.delete_many({"_id": {"$in": duplicate["ids"][1:]}}).deleted_count
+    print(f"{removed} doublons supprimés de {collection.name}")
+
+def setup_mongodb_indexes(db, timeseries=False):
     """Configure les index pour raw_market_data et market_data"""
     try:
         # Index pour raw_market_data
@@ -13,11 +50,19 @@ def setup_mongodb_indexes(db):
 
         # Index pour market_data
         market = db.market_data
-        market.create_index([("symbol", ASCENDING), ("openTime", DESCENDING)])
+        if timeseries:
+            # Collection time-series : pas d'index unique, le TTL est une option de la collection
+            market.create_index([("symbol", ASCENDING), ("openTime", DESCENDING)])
+            print("Index créés pour market_data (time-series)")
+            return
+
+        # Une seule bougie par (symbol, openTime) : les chargements font des upserts sur cette clé
+        remove_duplicate_candles(market)
+        market.create_index([("symbol", ASCENDING), ("openTime", ASCENDING)], unique=True)
         market.create_index([("symbol", ASCENDING), ("last_updated", DESCENDING)])
         market.create_index([("symbol", ASCENDING), ("openTime", ASCENDING), ("close", ASCENDING)])
         # TTL index pour suppression automatique après 7 jours
-        market.create_index([("openTime", ASCENDING)], expireAfterSeconds=604800)
+        market.create_index([("openTime", ASCENDING)], expireAfterSeconds=MARKET_DATA_TTL)
         print("Index créés pour market_data")
 
     except Exception as e:
@@ -63,6 +108,10 @@ def main():
     username = os.getenv("USERNAME", "").strip()
     password = os.getenv("PASSWORD", "").strip()
 
+    with open(CONFIG_DIR) as f:
+        config = json.load(f)
+    timeseries = config.get("storage", "collection") == "timeseries"
+
     try:
         # Connexion à MongoDB
         client = MongoClient(
@@ -75,7 +124,9 @@ def main():
 
         # Initialisation
         create_collection_with_validation(db)
-        setup_mongodb_indexes(db)
+        if timeseries:
+            create_market_data_timeseries(db, config["interval"])
+        setup_mongodb_indexes(db, timeseries)
 
         # Vérification des index
         print("\nIndex pour raw_market_data:")
@@ -0,0 +1,184 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from extract import TIME_COLUMNS, fetch_data_klines, fetch_first_open_time, interval_to_milliseconds
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '../data/cache/klines')
+
+
+def _to_milliseconds(date):
+    """Converts a datetime (naive dates are local time, as in `fetch_data_klines`) to ms."""
+    return int(date.timestamp() * 1000)
+
+
+def _month_start(timestamp):
+    date = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(date):
+    return date.replace(year=date.year + 1, month=1) if date.month == 12 else date.replace(month=date.month + 1)
+
+
+class KlineCache:
+    """
+    On-disk cache of closed klines, partitioned by symbol/interval/month.
+
+    Each partition is a compressed NumPy archive holding one array per kline
+    column (times stored as int64 milliseconds). Range requests are answered
+    from disk; the API is only called for months that are missing or whose
+    last candles were not closed yet when the partition was written. The
+    openTime of the first candle of a symbol is stored next to its partitions.
+
+    Parameters:
+    ----------
+    endpoint: str
+        API endpoint for candlestick data.
+    columns: list
+        Column names for klines data
+    limit: int
+        1000 (maximum allowed.)
+    cache_dir: str
+        Root directory of the partitions.
+    """
+    def __init__(self, endpoint, columns, limit, cache_dir=CACHE_DIR):
+        self.endpoint = endpoint
+        self.columns = list(columns)
+        self.limit = limit
+        self.cache_dir = cache_dir
+
+    def partition_path(self, symbol, interval, month):
+        return os.path.join(self.cache_dir, symbol, interval, f"{month:%Y-%m}.npz")
+
+    def first_open_time_path(self, symbol, interval):
+        return os.path.join(self.cache_dir, symbol, interval, "first_open_time.npy")
+
+    def first_open_time(self, symbol, interval):
+        """
+        Returns the openTime (ms) of the first candle of a symbol, fetched from the
+        API only once and then read from the cache, or None if it has no candles.
+        """
+        path = self.first_open_time_path(symbol, interval)
+        if os.path.exists(path):
+            return int(np.load(path))
+
+        first_open_time = fetch_first_open_time(self.endpoint, symbol, interval)
+        if first_open_time is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.npy"
+            np.save(tmp_path, np.int64(first_open_time))
+            os.replace(tmp_path, path)
+        return first_open_time
+
+    def read_partition(self, symbol, interval, month):
+        """
+        Reads one month partition.
+
+        Returns:
+        -------
+        (columns, complete): a dictionary of arrays and whether the month is
+        fully closed, or (None, False) if the partition does not exist.
+        """
+        path = self.partition_path(symbol, interval, month)
+        if not os.path.exists(path):
+            return None, False
+        with np.load(path) as archive:
+            columns = {name: archive[name] for name in self.columns}
+            complete = bool(archive['__complete__'])
+        return columns, complete
+
+    def write_partition(self, symbol, interval, month, columns, complete):
+        path = self.partition_path(symbol, interval, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so that a crash never leaves a truncated partition
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, __complete__=np.array(complete), **columns)
+        os.replace(tmp_path, path)
+
+    def _frame_to_columns(self, df):
+        columns = {}
+        for name in self.columns:
+            values = df[name].to_numpy()
+            if name in TIME_COLUMNS:
+                values = values.astype('datetime64[ms]').astype(np.int64)
+            columns[name] = values
+        return columns
+
+    def _update_month(self, symbol, interval, month, cached, now):
+        """Fetches the candles missing from a month partition and stores the closed ones."""
+        interval_ms = interval_to_milliseconds(interval)
+        month_start = _to_milliseconds(month)
+        month_end = _to_milliseconds(_next_month(month)) - 1
+
+        fetch_from = month_start
+        if cached is not None and len(cached['openTime']):
+            fetch_from = int(cached['openTime'][-1]) + interval_ms
+
+        fresh = fetch_data_klines(
+            self.endpoint, symbol, interval, self.columns, self.limit,
+            start_date=datetime.fromtimestamp(fetch_from / 1000, tz=timezone.utc),
+            end_date=datetime.fromtimestamp(min(month_end, now) / 1000, tz=timezone.utc),
+            as_frame=True
+        )
+        fresh = fresh[fresh['openTime'] <= pd.to_datetime(month_end, unit='ms')]
+        fresh = self._frame_to_columns(fresh)
+
+        if cached is not None:
+            merged = {name: np.concatenate([cached[name], fresh[name]]) for name in self.columns}
+        else:
+            merged = fresh
+
+        # Only closed candles are persisted, the still-open one is refetched next time
+        closed = merged['closeTime'] < now
+        stored = {name: values[closed] for name, values in merged.items()}
+        self.write_partition(symbol, interval, month, stored, complete=month_end < now)
+
+        return merged
+
+    def get_klines(self, symbol, interval, start_date=None, end_date=None):
+        """
+        Returns the klines of [start_date, end_date], reading closed months from disk.
+
+        Parameters:
+        ----------
+        symbol: str
+            Cryptocurrency pair (e.g. "BTCUSDT")
+        interval: str
+            Candle interval (e.g. "4h")
+        start_date, end_date: datetime
+            Range to return, from the earliest available data to now by default.
+
+        Returns:
+        -------
+        A DataFrame sorted by ascending openTime, like `fetch_data_klines(as_frame=True)`.
+        """
+        now = int(time.time() * 1000)
+        end_timestamp = min(_to_milliseconds(end_date), now) if end_date else now
+        if start_date is not None:
+            start_timestamp = _to_milliseconds(start_date)
+        else:
+            start_timestamp = self.first_open_time(symbol, interval)
+            if start_timestamp is None:
+                start_timestamp = end_timestamp
+
+        parts = []
+        month = _month_start(start_timestamp)
+        while _to_milliseconds(month) <= end_timestamp:
+            cached, complete = self.read_partition(symbol, interval, month)
+            if not complete:
+                print(f"Cache miss for {symbol} {interval} {month:%Y-%m}")
+                cached = self._update_month(symbol, interval, month, cached, now)
+            parts.append(cached)
+            month = _next_month(month)
+
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in self.columns}
+        in_range = (columns['openTime'] >= start_timestamp) & (columns['openTime'] <= end_timestamp)
+
+        df = pd.DataFrame({name: values[in_range] for name, values in columns.items()})
+        for name in TIME_COLUMNS:
+            df[name] = pd.to_datetime(df[name], unit='ms')
+        return df.reset_index(drop=True)
@@ -1,13 +1,34 @@
 import json
-from pymongo import MongoClient
+import bson
+from bson.raw_bson import RawBSONDocument
+from collections.abc import Mapping
+from itertools import repeat
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from pprint import pprint 
 from dotenv import load_dotenv
 import datetime
-from extract import load_config, fetch_data_klines
-from Data_processor import DataProcessor
+from extract import load_config, interval_to_milliseconds, iter_klines, iter_prefetched
+from extract_async import fetch_all_klines
+from http_client import configure_client, get_client
+from kline_cache import KlineCache
+from process_pool import process_symbols
+from validation import clean_klines
+from init_mongodb import create_market_data_timeseries, remove_duplicate_candles
+from buckets import BUCKET_COLLECTION, append_operations, latest_open_time, read_buckets, trim_operations
+from mongo_indicators import compute_indicators, store_raw_candles
+from Data_processor import DataProcessor, IncrementalIndicators, PanelIndicators, CandleResampler
 import os
 import pandas as pd
 
+# Bougies précédentes nécessaires au calcul des indicateurs (BB sur 20 périodes, RSI sur 14)
+WARMUP_CANDLES = DataProcessor.LOOKBACK
+# Champs des documents de market_data, les indicateurs sont regroupés dans `indicator`
+DOCUMENT_FIELDS = ["symbol", "rows", "openTime", "open", "high", "low", "close", "volume",
+                   "trend", "volume_price_ratio"]
+INDICATOR_FIELDS = ["BB_MA", "BB_UPPER", "BB_LOWER", "RSI", "DOJI", "HAMMER", "SHOOTING_STAR"]
+# Champs qui ne comptent pas comme un changement de la bougie lors d'un upsert
+UPSERT_IGNORED_FIELDS = ["symbol", "openTime", "last_updated", "rows"]
 
 
 def create_collection(db, collection_name, validator=None):
@@ -37,34 +58,45 @@ def create_collection(db, collection_name, validator=None):
         print(f"collection {collection_name} already exist")
 
 
-def transform_data(row):
-    """
-    Transforms data into Document for MongoDB.
-    """
-    if isinstance(row, pd.Series):
-        row = row.to_dict()
-
-    return {"symbol": row.get("symbol"),
-        "last_updated": datetime.datetime.now(),
-        "rows": row.get("rows"),
-        "openTime": row.get("openTime"),
-        "open": row.get("open"),
-        "high": row.get("high"),
-        "low": row.get("low"),
-        "close": row.get("close"),
-        "volume": row.get("volume"),
-        "trend": row.get("trend"),
-        "volume_price_ratio": row.get("volume_price_ratio"),
-        "indicator": {
-            "BB_MA": row.get("BB_MA"),
-            "BB_UPPER": row.get("BB_UPPER"),
-            "BB_LOWER": row.get("BB_LOWER"),
-            "RSI": row.get("RSI"),
-            "DOJI": row.get("DOJI"),
-            "HAMMER": row.get("HAMMER"),
-            "SHOOTING_STAR": row.get("SHOOTING_STAR"),
-        },
-    }
+def build_documents(df, extra_fields=(), last_updated=None, encode=False):
+    """
+    Transforms a processed DataFrame into MongoDB documents, column by column.
+
+    Parameters:
+        - df : DataFrame
+            Processed candles (see DataProcessor.FINAL_COLUMNS) with symbol and rows.
+        - extra_fields (tuple): 
+            Additional columns stored as top-level fields (e.g. closeTime).
+        - last_updated : datetime
+            Timestamp of the batch, now by default.
+        - encode (bool): 
+            Whether the documents are returned already encoded as BSON.
+
+    Algorithms:
+        - Each column is converted once to a list of Python values, documents are 
+            then zipped from these lists with the nested `indicator` sub-document.
+        - A single last_updated is shared by every document of the batch.
+        - Missing columns are stored as null, datetimes as datetime.datetime.
+    """
+    last_updated = datetime.datetime.now() if last_updated is None else last_updated
+
+    def column(name):
+        if name not in df.columns:
+            return repeat(None)
+        if pd.api.types.is_datetime64_any_dtype(df[name]):
+            # datetime.datetime objects, much cheaper to build than pandas Timestamps
+            return df[name].to_numpy(dtype="datetime64[us]").tolist()
+        return df[name].tolist()
+
+    indicator = [dict(zip(INDICATOR_FIELDS, values)) for values in zip(*map(column, INDICATOR_FIELDS))]
+    keys = ["symbol", "last_updated", *DOCUMENT_FIELDS[1:], "indicator", *extra_fields]
+    columns = [column("symbol"), repeat(last_updated), *map(column, DOCUMENT_FIELDS[1:]), indicator,
+               *map(column, extra_fields)]
+
+    documents = [dict(zip(keys, values)) for values in zip(*columns)]
+    if encode:
+        return [RawBSONDocument(bson.encode(document)) for document in documents]
+    return documents
 
 
 def insert_data_to_mongo(db, collection_name, data):
@@ -87,7 +119,7 @@ def insert_data_to_mongo(db, collection_name, data):
 
     collection = db[collection_name]
     try:
-        if isinstance(data, list) and all(isinstance(doc, dict) for doc in data):
+        if isinstance(data, list) and all(isinstance(doc, Mapping) for doc in data):
             print(f"Inserting data into collection {collection_name}.")
             collection.insert_many(data)
             print(f"Data inserted successfully into {collection_name}.")
@@ -96,6 +128,303 @@ def insert_data_to_mongo(db, collection_name, data):
     except Exception as e:
         print(f"Error data insertion into {collection_name} : {e}")
 
+CANDLE_KEY = [("symbol", ASCENDING), ("openTime", ASCENDING)]
+
+def create_candle_key(collection):
+    """
+    Creates the unique (symbol, openTime) index used by the upserts and $merge.
+
+    Parameters:
+        - collection : MongoDB collection.
+            Candle collection (e.g. market_data).
+
+    Algorithms:
+        - Plain inserts of older runs may have stored the same candle several times:
+            the duplicates are removed first (the latest version is kept), only while
+            the unique index does not exist yet.
+    """
+    key = tuple(CANDLE_KEY)
+    for index in collection.index_information().values():
+        if tuple(index["key"]) == key and index.get("unique"):
+            return
+    remove_duplicate_candles(collection)
+    collection.create_index(CANDLE_KEY, unique=True)
+
+def upsert_operation(document):
+    """
+    Builds the upsert of a document keyed on (symbol, openTime).
+
+    The update is a pipeline: the stored document is kept as is when none of its
+    values changed (last_updated included), otherwise the new document is merged into it.
+    """
+    values = {key: value for key, value in document.items() if key not in UPSERT_IGNORED_FIELDS}
+    unchanged = {"$and": [{"$eq": [f"${key}", {"$literal": value}]} for key, value in values.items()]}
+    return UpdateOne(
+        {"symbol": document["symbol"], "openTime": document["openTime"]},
+        [{"$replaceWith": {"$cond": [unchanged, "$$ROOT", {"$mergeObjects": ["$$ROOT", {"$literal": document}]}]}}],
+        upsert=True
+    )
+
+
+def upsert_documents(db, collection_name, documents, batch_size=1000):
+    """
+    Upserts documents into a MongoDB collection with a unique (symbol, openTime) index.
+
+    Parameters:
+        - db : MongoDB database.
+        - collection_name (str): 
+            Name of the collection.
+        - documents (list): 
+            Documents built by build_documents.
+        - batch_size (int): 
+            Number of upserts sent per bulk_write.
+
+    Algorithms:
+        - Unordered bulk_write of UpdateOne upserts, batch by batch: a failed upsert 
+            does not stop the others of its batch.
+        - Documents whose values did not change are left untouched.
+
+    Returns:
+        - A dictionary with the inserted, updated and unchanged document counts.
+    """
+    collection = db[collection_name]
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for start in range(0, len(documents), batch_size):
+        operations = [upsert_operation(document) for document in documents[start:start + batch_size]]
+        try:
+            result = collection.bulk_write(operations, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+            print(f"Error upserting into {collection_name} : {len(result['writeErrors'])} failed documents")
+        counts["inserted"] += result["nUpserted"]
+        counts["updated"] += result["nModified"]
+        counts["unchanged"] += result["nMatched"] - result["nModified"]
+    print(f"Upserted into {collection_name}: {counts}")
+    return counts
+
+
+def store_candles(db, collection_name, df, upsert=True, batch_size=1000, encode=False, bucket_period=None):
+    """
+    Stores the processed candles of a symbol, replacing the stored versions of the same candles.
+
+    Parameters:
+        - db : MongoDB database.
+        - collection_name (str): 
+            Name of the collection.
+        - df : DataFrame
+            Processed candles of one symbol, with symbol and rows.
+        - upsert (bool): 
+            Whether candles are upserted (see upsert_documents), otherwise the candles 
+            stored since the first one of df are deleted before an insert.
+        - batch_size (int): 
+            Option of upsert_documents.
+        - encode (bool): 
+            Option of build_documents, only for inserts: upserts and buckets build 
+            their update operations from the document values.
+        - bucket_period (str): 
+            "day" or "month" to store the candles in bucket documents (see buckets.py).
+    """
+    if df.empty:
+        return
+    if bucket_period:
+        # The stored candles from the first one of df are trimmed, then df is appended
+        symbol = df["symbol"].iloc[0]
+        operations = trim_operations(symbol, df["openTime"].min().to_pydatetime(), bucket_period)
+        operations += append_operations(df, symbol, bucket_period)
+        result = db[collection_name].bulk_write(operations, ordered=True)
+        print(f"Stored {len(df)} candles for {symbol} in {result.upserted_count + result.modified_count} buckets")
+    elif upsert:
+        upsert_documents(db, collection_name, build_documents(df), batch_size)
+    else:
+        delete_candles_since(db, collection_name, df["symbol"].iloc[0], df["openTime"].min().to_pydatetime())
+        insert_data_to_mongo(db, collection_name, build_documents(df, encode=encode))
+
+
+def get_latest_open_time(db, collection_name, symbol):
+    """
+    Returns the latest stored openTime of a symbol (incremental watermark).
+
+    Parameters:
+        - db : MongoDB database.
+        - collection_name (str): 
+            Collection holding the candles (market_data, raw_market_data or the buckets).
+        - symbol (str): 
+            Cryptocurrency pair (e.g. "BTCUSDT").
+
+    Returns:
+        - The openTime of the latest candle as a UTC datetime, 
+            or None when the symbol has no stored data.
+    """
+    if collection_name == BUCKET_COLLECTION:
+        latest = latest_open_time(db[collection_name], symbol)
+    else:
+        latest = db[collection_name].find_one(
+            {"symbol": symbol},
+            {"openTime": 1, "_id": 0},
+            sort=[("openTime", -1)]
+        )
+        latest = latest["openTime"] if latest else None
+    if latest is None:
+        return None
+    return latest.replace(tzinfo=datetime.timezone.utc)
+
+
+def delete_candles_since(db, collection_name, symbol, since):
+    """
+    Deletes the candles of a symbol opened at or after `since`.
+
+    Used before an incremental insert so that the candle which was still
+    open during the previous run is replaced by its refetched version.
+    """
+    result = db[collection_name].delete_many({"symbol": symbol, "openTime": {"$gte": since}})
+    print(f"Deleted {result.deleted_count} candles for {symbol} since {since}")
+
+
+def load_indicator_state(db, symbol):
+    """
+    Returns the persisted indicator state of a symbol (see IncrementalIndicators),
+    or None when the symbol was never processed incrementally.
+    """
+    return db["indicator_state"].find_one({"symbol": symbol}, {"_id": 0})
+
+
+def save_indicator_state(db, state):
+    """
+    Persists the indicator state of a symbol, one document per symbol.
+    """
+    db["indicator_state"].replace_one({"symbol": state["symbol"]}, state, upsert=True)
+
+
+def update_higher_timeframes(db, symbols, base_interval, intervals, source="market_data", bucketed=False):
+    """
+    Derives higher-timeframe candles (e.g. 1d, 1w, 1M) from the stored base candles.
+
+    Parameters:
+        - db : MongoDB database.
+        - symbols (list): 
+            Cryptocurrency pairs (e.g. ["BTCUSDT", "ETHUSDT"]).
+        - base_interval (str): 
+            Interval of the candles stored in `source` (e.g. "4h").
+        - intervals (list): 
+            Higher timeframes to maintain, each one in the collection <source>_<interval>.
+        - bucketed (bool): 
+            Whether the base candles are read from the bucket documents (see buckets.py).
+
+    Algorithms:
+        - Only the closed base candles newer than the last aggregated one are read.
+        - They are resampled for all the symbols at once and merged into the stored 
+            bars that were still open.
+        - A bar is complete only when its base candles cover the whole period: a bar 
+            starting after the period start (e.g. history cut by the TTL) stays incomplete.
+        - Indicators of the touched bars are recomputed with the previous bars as warm-up,
+            bars without enough history are kept with empty indicators.
+    """
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    base_delta = pd.Timedelta(milliseconds=interval_to_milliseconds(base_interval))
+    projection = {"_id": 0, "symbol": 1, "openTime": 1, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1}
+
+    for interval in intervals:
+        collection = db[f"{source}_{interval}"]
+
+        previous = []
+        queries = []
+        for symbol in symbols:
+            last = collection.find_one({"symbol": symbol}, sort=[("openTime", -1)])
+            query = {"symbol": symbol}
+            if last:
+                previous.append(last)
+                query["openTime"] = {"$gt": last["lastBaseOpenTime"]}
+            queries.append(query)
+
+        if bucketed:
+            frames = []
+            for query in queries:
+                since = query.get("openTime", {}).get("$gt")
+                df = read_buckets(db[BUCKET_COLLECTION], query["symbol"], since, fields=PanelIndicators.FIELDS)
+                if since is not None:
+                    df = df[df["openTime"] > since]
+                frames.append(df.assign(symbol=query["symbol"]))
+            base = pd.concat(frames, ignore_index=True)
+        else:
+            base = pd.DataFrame(list(db[source].find({"$or": queries}, projection)))
+        if base.empty:
+            continue
+        base = base[base["openTime"] + base_delta <= now]
+
+        bars = CandleResampler.resample(base, interval, base_interval)
+        bars = CandleResampler.merge_open_bars(pd.DataFrame(previous), bars, base_interval)
+        if bars.empty:
+            continue
+
+        frames = {}
+        for symbol, symbol_bars in bars.groupby("symbol"):
+            warmup = collection.find(
+                {"symbol": symbol, "openTime": {"$lt": symbol_bars["openTime"].min()}}, projection
+            ).sort("openTime", -1).limit(WARMUP_CANDLES)
+            frames[symbol] = pd.concat([pd.DataFrame(list(warmup)), symbol_bars], ignore_index=True)
+        processed = PanelIndicators.process_frames(frames, dropna=False)
+
+        for symbol, symbol_bars in bars.groupby("symbol"):
+            df = processed[symbol]
+            df = df[df["openTime"] >= symbol_bars["openTime"].min()]
+            bar_fields = ["closeTime", "baseCount", "firstBaseOpenTime", "lastBaseOpenTime", "complete"]
+            df = df.merge(symbol_bars[["openTime", *bar_fields]], on="openTime")
+            df["symbol"] = symbol
+            df["rows"] = len(df)
+
+            docs = build_documents(df, bar_fields)
+
+            delete_candles_since(db, collection.name, symbol, df["openTime"].min().to_pydatetime())
+            insert_data_to_mongo(db, collection.name, docs)
+
+
+def load_symbol_stream(db, collection_name, symbol, pages, watermark=None, interval=None, reject_zero_volume=True,
+                       **store_options):
+    """
+    Processes and inserts the klines of a symbol page by page.
+
+    Parameters:
+        - db : MongoDB database.
+        - collection_name (str): 
+            Name of the collection to insert into.
+        - symbol (str): 
+            Cryptocurrency pair (e.g. "BTCUSDT").
+        - pages : iterable of DataFrame
+            Raw kline pages in chronological order (see extract.iter_klines).
+        - watermark : datetime
+            Latest stored openTime, earlier candles only warm up the indicators.
+        - interval (str), reject_zero_volume (bool): 
+            Validation settings of each page (see validation.validate_klines).
+        - store_options : 
+            upsert, batch_size and encode options of store_candles.
+
+    Algorithms:
+        - DataProcessor.process_chunks prepends the last raw candles of a page to the
+            next one so that rolling indicators are continuous across pages.
+        - Each processed page is stored before the next one is handled, so memory 
+            stays bounded by the page size whatever the history length.
+    """
+    if watermark is not None:
+        watermark = pd.Timestamp(watermark.replace(tzinfo=None))
+
+    inserted = 0
+    pages = (clean_klines(page, symbol, interval, reject_zero_volume) for page in pages)
+    for df in DataProcessor.process_chunks(pages):
+        if watermark is not None:
+            df = df[df['openTime'] >= watermark]
+
+        if df.empty:
+            continue
+
+        inserted += len(df)
+        df['symbol'] = symbol
+        df['rows'] = inserted
+
+        store_candles(db, collection_name, df, **store_options)
+
+    print(f"Streamed {inserted} rows for symbol: {symbol}")
+
+
 def main():
 
     # Load .env file from a custom path
@@ -113,6 +442,44 @@ def main():
     columns_klines = config["columns_klines"]
     limit = config["limit"]
     endpoint_klines = config["api_endpoints"]["binance_klines"]
+    max_connections = config.get("max_connections", 20)
+    incremental = config.get("incremental", False)
+    backfill = config.get("backfill", False)
+    use_cache = config.get("kline_cache", False)
+    streaming = config.get("streaming", False)
+    prefetch_pages = config.get("prefetch_pages", 4)
+    incremental_indicators = config.get("indicator_engine", "batch") == "incremental"
+    panel_indicators = config.get("indicator_engine", "batch") == "panel"
+    # Raw candles go to raw_market_data, the indicators are computed by a MongoDB pipeline
+    server_indicators = config.get("indicator_engine", "batch") == "server"
+    resample_intervals = config.get("resample_intervals", [])
+    workers = config.get("workers", 1)
+    reject_zero_volume = config.get("reject_zero_volume", True)
+    # Time-series collections have no unique index nor upserts: candles are deleted then inserted
+    timeseries = config.get("storage", "collection") == "timeseries"
+    # Bucket documents: one document per symbol and day/month holding arrays of candles
+    bucketed = config.get("storage", "collection") == "buckets"
+    candles = BUCKET_COLLECTION if bucketed else "market_data"
+    store_options = {
+        "upsert": config.get("upsert", True) and not (timeseries or bucketed),
+        "batch_size": config.get("upsert_batch_size", 1000),
+        "encode": config.get("bson_documents", False),
+        "bucket_period": config.get("bucket_period", "month") if bucketed else None,
+    }
+    if streaming and (incremental_indicators or panel_indicators):
+        # Streamed pages are processed by DataProcessor.process_chunks, from the watermark
+        # minus the warm-up candles: the persisted state and the panel are not used
+        raise Exception("Error: streaming only supports the batch and server indicator engines")
+    if server_indicators and (timeseries or bucketed):
+        raise Exception("Error: the server indicator engine merges into the regular market_data collection")
+    parallel = workers > 1 and not (streaming or incremental_indicators or panel_indicators or server_indicators)
+    if workers > 1 and not parallel:
+        print(f"Warning: workers={workers} is ignored, the process pool only runs the batch indicator engine "
+              f"without streaming")
+    if store_options["encode"] and (store_options["upsert"] or bucketed):
+        print("Warning: bson_documents is ignored, pre-encoded documents are only used by inserts "
+              "(upsert disabled or time-series storage)")
+    configure_client(**config.get("http", {}))
 
     try:
 
@@ -125,40 +492,132 @@ def main():
        )
 
         db = client.Cryptobot # Select database
-        create_collection(db, "market_data") # Create collection named "market_data"
+        if timeseries:
+            create_market_data_timeseries(db, interval)
+        elif bucketed:
+            create_collection(db, candles)
+            db[candles].create_index([("symbol", ASCENDING), ("bucket", ASCENDING)], unique=True)
+        else:
+            create_collection(db, "market_data") # Create collection named "market_data"
+        if store_options["upsert"] or server_indicators:
+            # Key of the upserts and of $merge
+            create_candle_key(db.market_data)
 
 
-        for symbol in symbols:
-            print(f"Fetching data for symbol: {symbol}")
-            data = fetch_data_klines(endpoint_klines, symbol, interval, columns_klines, limit)
-            if not isinstance(data, list):
-                print(f"Erreur: Les données pour le symbole {symbol} ne sont pas une liste.")
-                continue
-            
-            #
-            if not all(isinstance(record, dict) for record in data):
-                print(f"Erreur: Les éléments de données pour le symbole {symbol} ne sont pas des dictionnaires.")
-                continue
-            for record in data:
-                record['close'] = float(record['close'])
-                record['open'] = float(record['open'])
-                record['high'] = float(record['high'])
-                record['low'] = float(record['low'])
-                record['volume'] = float(record['volume'])
-                record['quoteVolume'] = float(record['quoteVolume'])
-                record['openTime'] = pd.to_datetime(record['openTime'], unit='ms')
-                record['closeTime'] = pd.to_datetime(record['closeTime'], unit='ms')
-            
-            df = pd.DataFrame(data)
-            print(f"Processing data for symbol: {symbol}")
-            df = DataProcessor.process_dataframe(df)
-            df['symbol'] = symbol
-            df['rows'] = len(df) 
-
-            df_final = [transform_data(row.to_dict()) for _, row in df.iterrows()]
-            print(f"Inserting data for symbol: {symbol}")
-            insert_data_to_mongo(db,"market_data",df_final) # insert collection in database
+        # Incremental mode: restart from the latest stored candle (refetched as it may
+        # have been still open) with enough history before it to warm up the indicators
+        watermarks = {}
+        start_dates = {}
+        states = {}
+        if incremental:
+            interval_delta = datetime.timedelta(milliseconds=interval_to_milliseconds(interval))
+            for symbol in symbols:
+                watermark = get_latest_open_time(db, candles, symbol)
+                if watermark is not None:
+                    watermarks[symbol] = watermark
+                    start_dates[symbol] = watermark - WARMUP_CANDLES * interval_delta
+                    print(f"Incremental fetch for {symbol} from {watermark}")
+
+                state = load_indicator_state(db, symbol) if incremental_indicators else None
+                if state is not None and state["last_open_time"] is not None and watermark is not None:
+                    # The persisted rolling windows replace the warm-up candles
+                    states[symbol] = state
+                    start_dates[symbol] = state["last_open_time"].replace(tzinfo=datetime.timezone.utc) + interval_delta
+
+        if streaming:
+            # Pages flow through processing and loading while the next ones download
+            for symbol in symbols:
+                print(f"Streaming data for symbol: {symbol}")
+                pages = iter_klines(endpoint_klines, symbol, interval, columns_klines, limit, start_dates.get(symbol))
+                try:
+                    if server_indicators:
+                        for page in iter_prefetched(pages, prefetch_pages):
+                            store_raw_candles(db, symbol, clean_klines(page, symbol, interval, reject_zero_volume))
+                        compute_indicators(db, symbol, since=watermarks.get(symbol))
+                        continue
+                    load_symbol_stream(db, candles, symbol, iter_prefetched(pages, prefetch_pages),
+                                       watermarks.get(symbol), interval, reject_zero_volume, **store_options)
+                except Exception as e:
+                    print(f"Error streaming data for {symbol}: {e}")
+        else:
+            print(f"Fetching data for symbols: {symbols}")
+            if use_cache:
+                # Closed months are read from the local cache, only the missing ones hit the API
+                cache = KlineCache(endpoint_klines, columns_klines, limit)
+                all_data = {}
+                for symbol in symbols:
+                    try:
+                        all_data[symbol] = cache.get_klines(symbol, interval, start_dates.get(symbol))
+                    except Exception as e:
+                        all_data[symbol] = e
+            else:
+                all_data = fetch_all_klines(endpoint_klines, symbols, interval, columns_klines, limit,
+                                            max_connections=max_connections, start_dates=start_dates,
+                                            backfill=backfill, as_frame=True)
+
+            frames = {}
+            for symbol in symbols:
+                df = all_data[symbol]
+                if isinstance(df, Exception):
+                    print(f"Error fetching data for {symbol}: {df}")
+                    continue
+                # Invalid candles are rejected before they are processed and stored
+                df = clean_klines(df, symbol, interval, reject_zero_volume)
+                if df.empty:
+                    print(f"No data returned for {symbol}.")
+                    continue
+                frames[symbol] = df
+
+            if server_indicators:
+                # Only the raw candles leave Python, MongoDB computes and merges the indicators
+                for symbol, df in frames.items():
+                    store_raw_candles(db, symbol, df)
+                    compute_indicators(db, symbol, since=watermarks.get(symbol))
+                results = []
+            elif panel_indicators:
+                # All the symbols are processed together as (time x symbol) arrays
+                results = PanelIndicators.process_frames(frames).items()
+            elif parallel:
+                # Worker processes handle the symbols, each one is stored as soon as it is done
+                print(f"Processing data for {len(frames)} symbols with {workers} workers")
+                results = process_symbols(frames, workers)
+            else:
+                results = frames.items()
+
+            for symbol, df in results:
+                if isinstance(df, Exception):
+                    print(f"Error processing data for {symbol}: {df}")
+                    continue
+
+                state = None
+                if incremental_indicators:
+                    # Only the candles after the persisted state are computed
+                    print(f"Processing data for symbol: {symbol}")
+                    state = states.get(symbol) or IncrementalIndicators.new_state(symbol)
+                    df, state = IncrementalIndicators.update(state, df)
+                elif not (panel_indicators or parallel):
+                    print(f"Processing data for symbol: {symbol}")
+                    # Stored at full precision, compact_frames only applies to the readers (see schema)
+                    df = DataProcessor.process_dataframe(df)
+                df['symbol'] = symbol
+                df['rows'] = len(df) 
+
+                if symbol in watermarks:
+                    # Drop the warm-up candles, they are already stored
+                    df = df[df['openTime'] >= watermarks[symbol].replace(tzinfo=None)]
+
+                print(f"Storing data for symbol: {symbol}")
+                store_candles(db, candles, df, **store_options)
+                if state is not None:
+                    save_indicator_state(db, state)
+
+
+        if resample_intervals:
+            # Higher timeframes are derived from the stored candles, not fetched
+            update_higher_timeframes(db, symbols, interval, resample_intervals, bucketed=bucketed)
 
+        for endpoint, stats in get_client().stats().items():
+            print(f"HTTP stats for {endpoint}: {stats}")
 
         # Verifying 
         col = db["market_data"]
@@ -0,0 +1,174 @@
+from Data_processor import DataProcessor
+
+# Schema-validated collection of the raw klines (see init_mongodb.create_collection_with_validation)
+RAW_COLLECTION = "raw_market_data"
+RAW_FIELDS = ["open", "high", "low", "close", "volume", "quoteVolume"]
+# Fields compared to tell an unchanged candle from an updated one (see load.upsert_operation)
+COMPARED_FIELDS = ["open", "high", "low", "close", "volume", "trend", "volume_price_ratio", "indicator"]
+
+
+def _round(expression, decimals=2):
+    return {"$round": [expression, decimals]}
+
+
+def _flag(condition):
+    return {"$cond": [condition, 1, 0]}
+
+
+def build_raw_documents(df, symbol):
+    """
+    Transforms raw klines into raw_market_data documents (see init_mongodb validator).
+    """
+    columns = [df["openTime"].to_numpy(dtype="datetime64[us]").tolist()]
+    columns += [df[field].astype(float).tolist() for field in RAW_FIELDS]
+    return [
+        {"symbol": symbol, "openTime": values[0], **dict(zip(RAW_FIELDS, values[1:]))}
+        for values in zip(*columns)
+    ]
+
+
+def store_raw_candles(db, symbol, df):
+    """
+    Stores the validated raw klines of a symbol in raw_market_data, replacing the
+    candles stored since the first one of df.
+    """
+    if df.empty:
+        return
+    documents = build_raw_documents(df, symbol)
+    db[RAW_COLLECTION].delete_many({"symbol": symbol, "openTime": {"$gte": documents[0]["openTime"]}})
+    db[RAW_COLLECTION].insert_many(documents)
+    print(f"Stored {len(documents)} raw candles for {symbol}")
+
+
+def indicator_pipeline(symbol, start=None, since=None, target="market_data", bb_window=20, bb_std=2, rsi_window=14):
+    """
+    Aggregation pipeline computing the indicators of DataProcessor.process_dataframe
+    inside MongoDB, from raw_market_data into `target`.
+
+    Parameters:
+    ----------
+    symbol: str
+        Cryptocurrency pair (e.g. "BTCUSDT").
+    start: datetime
+        First raw candle read, earlier candles are ignored (indicator warm-up start).
+    since: datetime
+        First candle written, the candles between start and since only warm up the windows.
+    target: str
+        Collection the documents are merged into, it needs a unique (symbol, openTime) index.
+
+    Returns:
+    -------
+    The list of pipeline stages.
+
+    Same formulas and roundings as DataProcessor: prices rounded to 2 decimals,
+    Bollinger bands on the typical price (sample standard deviation, bands from the
+    rounded average), RSI from the simple averages of the rounded gains and losses
+    (the first candle counts as no change), and candles without a full Bollinger
+    window or with an undefined RSI are dropped like DataProcessor's dropna.
+    """
+    match = {"symbol": symbol}
+    if start is not None:
+        match["openTime"] = {"$gte": start}
+
+    previous_close = {"$ifNull": ["$previousClose", "$close"]}
+    body, upper, lower, candle = "$body_size", "$upper_shadow", "$lower_shadow", "$candle_size"
+    unchanged = {"$and": [{"$eq": [f"${field}", f"$$new.{field}"]} for field in COMPARED_FIELDS]}
+
+    stages = [
+        {"$match": match},
+        {"$project": {"_id": 0, "symbol": 1, "openTime": 1,
+                      **{field: _round(f"${field}") for field in ["open", "high", "low", "close", "volume"]}}},
+        {"$setWindowFields": {
+            "partitionBy": "$symbol",
+            "sortBy": {"openTime": 1},
+            "output": {"previousClose": {"$shift": {"output": "$close", "by": -1}}},
+        }},
+        {"$set": {
+            "typical_price": {"$divide": [{"$add": ["$high", "$low", "$close"]}, 3]},
+            "gain": _round({"$max": [{"$subtract": ["$close", previous_close]}, 0]}),
+            "loss": _round({"$max": [{"$subtract": [previous_close, "$close"]}, 0]}),
+        }},
+        {"$setWindowFields": {
+            "partitionBy": "$symbol",
+            "sortBy": {"openTime": 1},
+            "output": {
+                "window_size": {"$count": {}, "window": {"documents": [1 - bb_window, 0]}},
+                "bb_mean": {"$avg": "$typical_price", "window": {"documents": [1 - bb_window, 0]}},
+                "bb_std": {"$stdDevSamp": "$typical_price", "window": {"documents": [1 - bb_window, 0]}},
+                "avg_gain": {"$avg": "$gain", "window": {"documents": [1 - rsi_window, 0]}},
+                "avg_loss": {"$avg": "$loss", "window": {"documents": [1 - rsi_window, 0]}},
+            },
+        }},
+        # Full Bollinger window (longer than the RSI one) and a defined RSI
+        {"$match": {"window_size": bb_window, "$or": [{"avg_gain": {"$ne": 0}}, {"avg_loss": {"$ne": 0}}],
+                    **({"openTime": {"$gte": since}} if since is not None else {})}},
+        {"$set": {
+            "BB_MA": _round("$bb_mean"),
+            "RSI": {"$cond": [{"$eq": ["$avg_loss", 0]}, 100.0, _round(
+                {"$subtract": [100, {"$divide": [100, {"$add": [1, {"$divide": ["$avg_gain", "$avg_loss"]}]}]}]}
+            )]},
+            "body_size": _round({"$abs": {"$subtract": ["$close", "$open"]}}),
+            "upper_shadow": _round({"$subtract": ["$high", {"$max": ["$open", "$close"]}]}),
+            "lower_shadow": _round({"$subtract": [{"$min": ["$open", "$close"]}, "$low"]}),
+            "candle_size": _round({"$subtract": ["$high", "$low"]}),
+        }},
+        {"$project": {
+            "_id": 0,
+            "symbol": 1,
+            "last_updated": "$$NOW",
+            "openTime": 1,
+            "open": 1,
+            "high": 1,
+            "low": 1,
+            "close": 1,
+            "volume": 1,
+            "trend": {"$cond": [{"$gt": ["$close", "$open"]}, 1, -1]},
+            "volume_price_ratio": {"$cond": [{"$eq": ["$close", 0]}, None,
+                                             _round({"$divide": ["$volume", "$close"]}, 4)]},
+            "indicator": {
+                "BB_MA": "$BB_MA",
+                "BB_UPPER": _round({"$add": ["$BB_MA", {"$multiply": ["$bb_std", bb_std]}]}),
+                "BB_LOWER": _round({"$subtract": ["$BB_MA", {"$multiply": ["$bb_std", bb_std]}]}),
+                "RSI": "$RSI",
+                "DOJI": _flag({"$lte": [body, {"$multiply": [candle, 0.1]}]}),
+                "HAMMER": _flag({"$and": [{"$gt": [lower, {"$multiply": [body, 2]}]},
+                                          {"$lte": [upper, {"$multiply": [body, 0.5]}]}]}),
+                "SHOOTING_STAR": _flag({"$and": [{"$gt": [upper, {"$multiply": [body, 2]}]},
+                                                 {"$lte": [lower, {"$multiply": [body, 0.5]}]}]}),
+            },
+        }},
+        # Unchanged candles keep their document (and last_updated), as with the upserts
+        {"$merge": {
+            "into": target,
+            "on": ["symbol", "openTime"],
+            "whenMatched": [{"$replaceWith": {"$cond": [unchanged, "$$ROOT", {"$mergeObjects": ["$$ROOT", "$$new"]}]}}],
+            "whenNotMatched": "insert",
+        }},
+    ]
+    return stages
+
+
+def warmup_start(db, symbol, since):
+    """
+    openTime of the raw candle DataProcessor.LOOKBACK candles before `since`,
+    the earliest one needed to compute the indicators from `since` on.
+    """
+    earlier = db[RAW_COLLECTION].find(
+        {"symbol": symbol, "openTime": {"$lt": since}}, {"openTime": 1, "_id": 0}
+    ).sort("openTime", -1).skip(DataProcessor.LOOKBACK - 1).limit(1)
+    earlier = list(earlier)
+    return earlier[0]["openTime"] if earlier else None
+
+
+def compute_indicators(db, symbol, since=None, target="market_data"):
+    """
+    Computes the indicators of a symbol inside MongoDB, from raw_market_data into `target`.
+
+    Parameters:
+    ----------
+    since: datetime
+        First candle to (re)compute, the whole history if None.
+    """
+    start = warmup_start(db, symbol, since) if since is not None else None
+    db[RAW_COLLECTION].aggregate(indicator_pipeline(symbol, start, since, target), allowDiskUse=True)
+    print(f"Indicators computed in MongoDB for {symbol}" + (f" since {since}" if since is not None else ""))
@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 from tensorflow.keras.models import load_model
 from pymongo import MongoClient
 import logging
+from buckets import BUCKET_COLLECTION, read_buckets
 
 # Configurer le logger
 logging.basicConfig(level=logging.INFO)
@@ -27,8 +28,12 @@ port = os.getenv("PORT", "27017").strip(",")
 username = os.getenv("USERNAME", "").strip()
 password = os.getenv("PASSWORD", "").strip()
 
+# Schéma de stockage des bougies choisi pour l'ETL (config "storage")
+with open(CONFIG_DIR) as config_file:
+    BUCKETED = json.load(config_file).get("storage") == "buckets"
 
-def load_data(symbol, features, scaler, model):
+
+def load_data(symbol, features, scaler, model, bucketed=BUCKETED):
     client = MongoClient(host, int(port), username=username, password=password)
     db = client.Cryptobot
     collection = db['market_data']
@@ -47,9 +52,11 @@ def load_data(symbol, features, scaler, model):
         "indicator": 1,
         "_id": 0
     }
-    cursor = collection.find(query,projection).sort("openTime", 1)
- 
-    df = pd.DataFrame(list(cursor))
+    if bucketed:
+        df = read_buckets(db[BUCKET_COLLECTION], symbol)
+    else:
+        cursor = collection.find(query,projection).sort("openTime", 1)
+        df = pd.DataFrame(list(cursor))
  
     if 'indicator' in df.columns:
         indicator_df = pd.json_normalize(df['indicator'])
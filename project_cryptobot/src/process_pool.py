@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from Data_processor import DataProcessor
+
+# Raw kline columns needed by DataProcessor.process_dataframe
+INPUT_DTYPES = {
+    'openTime': 'datetime64[ms]', 'closeTime': 'datetime64[ms]',
+    'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64',
+    'volume': 'float64', 'quoteVolume': 'float64',
+}
+OUTPUT_DTYPES = {
+    col: 'datetime64[ms]' if col == 'openTime'
+    else 'int64' if col in ('trend', 'DOJI', 'HAMMER', 'SHOOTING_STAR')
+    else 'float64'
+    for col in DataProcessor.FINAL_COLUMNS
+}
+
+
+class SharedBlock:
+    """
+    Fixed-width (8-byte) columns of a frame stored in one shared memory segment.
+
+    Worker processes attach to the segment by name, so candles and results
+    move between processes without pickling DataFrames. The parent process
+    creates and unlinks every segment.
+
+    Parameters:
+    ----------
+    dtypes: dict
+        Column name -> 8-byte NumPy dtype.
+    length: int
+        Rows per column.
+    name: str
+        Name of an existing segment to attach to, a new one is created if None.
+    """
+    def __init__(self, dtypes, length, name=None):
+        self.dtypes = dict(dtypes)
+        self.length = length
+        size = max(1, len(self.dtypes) * length * 8)
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+
+    @classmethod
+    def from_frame(cls, df, dtypes):
+        block = cls(dtypes, len(df))
+        try:
+            block.write(df)
+        except Exception:
+            block.release()
+            raise
+        return block
+
+    def spec(self):
+        """Picklable description used by the workers to attach to the segment."""
+        return self.dtypes, self.length, self.shm.name
+
+    def arrays(self):
+        """Column views on the shared buffer (no copy)."""
+        return {
+            col: np.ndarray((self.length,), dtype=dtype, buffer=self.shm.buf, offset=i * self.length * 8)
+            for i, (col, dtype) in enumerate(self.dtypes.items())
+        }
+
+    def write(self, df):
+        """Copies the columns of `df` into the first len(df) rows of the segment."""
+        for col, values in self.arrays().items():
+            column = df[col]
+            if values.dtype.kind == 'M':
+                column = pd.to_datetime(column, unit='ms')
+            values[:len(df)] = column.to_numpy(dtype=values.dtype)
+
+    def to_frame(self, rows=None):
+        """Copies the first `rows` rows out of the segment into a DataFrame."""
+        rows = self.length if rows is None else rows
+        return pd.DataFrame({col: values[:rows].copy() for col, values in self.arrays().items()})
+
+    def close(self):
+        self.shm.close()
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _process_block(input_spec, output_spec):
+    """Worker: processes the candles of one symbol from shared memory into shared memory."""
+    source = SharedBlock(*input_spec)
+    target = SharedBlock(*output_spec)
+    try:
+        df = DataProcessor.process_dataframe(source.to_frame())
+        target.write(df)
+        return len(df)
+    finally:
+        source.close()
+        target.close()
+
+
+def process_symbols(frames, workers=None):
+    """
+    Processes the klines of several symbols in a pool of worker processes.
+
+    Parameters:
+    ----------
+    frames: dict
+        Symbol -> raw klines DataFrame (see fetch_data_klines(as_frame=True)).
+    workers: int
+        Number of worker processes, os.cpu_count() by default.
+
+    Returns:
+    -------
+    A generator of (symbol, processed DataFrame or the exception raised),
+    yielded as soon as each symbol is done so that loading overlaps processing.
+    """
+    blocks = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            try:
+                for symbol, df in frames.items():
+                    source = SharedBlock.from_frame(df, INPUT_DTYPES)
+                    blocks.append(source)
+                    target = SharedBlock(OUTPUT_DTYPES, len(df))
+                    blocks.append(target)
+                    futures[pool.submit(_process_block, source.spec(), target.spec())] = (symbol, source, target)
+
+                for future in as_completed(futures):
+                    symbol, source, target = futures[future]
+                    try:
+                        result = symbol, target.to_frame(future.result())
+                    except Exception as e:
+                        result = symbol, e
+                    yield result
+                    # Released as soon as the symbol is consumed, memory stays bounded
+                    for block in (source, target):
+                        blocks.remove(block)
+                        block.release()
+            finally:
+                # The consumer stopped early or an error was raised: queued symbols are dropped
+                for future in futures:
+                    future.cancel()
+    finally:
+        # Segments not consumed yet are unlinked once the pool no longer uses them
+        for block in blocks:
+            block.release()
@@ -0,0 +1,332 @@
+"""
+Local stand-in for the Binance REST and WebSocket APIs.
+
+Serves the klines recorded in data/data_raw (and tickers/trades derived from
+them) with Binance's pagination rules, request-weight headers, 429/418 rate
+limiting and configurable latency, so extraction and ingestion can be
+benchmarked and regression-tested offline.
+
+Usage:
+    python src/replay_server.py --port 8080 --latency 0.05 --jitter 0.02
+
+Then point config.json "api_endpoints" at http://localhost:8080/api/v3/...
+and the WebSocket clients at ws://localhost:8080/ws.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import time
+import zlib
+
+import numpy as np
+from aiohttp import web
+
+DATA_RAW_DIR = os.path.join(os.path.dirname(__file__), '../data/data_raw')
+
+# Request weights of the endpoints we serve (Binance spot values)
+ENDPOINT_WEIGHTS = {'klines': 2, 'ticker': 2, 'tickers': 40, 'trades': 25, 'aggTrades': 2}
+# Synthetic trades generated per recorded candle
+TRADES_PER_CANDLE = 50
+
+
+class RecordedMarket:
+    """
+    Recorded klines of every symbol found in `data_dir`, indexed for range queries.
+
+    Parameters:
+    ----------
+    data_dir: str
+        Directory holding the `<SYMBOL>_data_klines.json` files.
+    interval: str
+        Interval of the recorded klines.
+    """
+    def __init__(self, data_dir=DATA_RAW_DIR, interval='4h'):
+        self.interval = interval
+        self.klines = {}
+        self.open_times = {}
+        for path in glob.glob(os.path.join(data_dir, '*_data_klines.json')):
+            symbol = os.path.basename(path).split('_')[0]
+            with open(path, 'r') as file:
+                records = sorted(json.load(file)['data'], key=lambda k: k['openTime'])
+            self.klines[symbol] = [list(record.values()) for record in records]
+            self.open_times[symbol] = np.array([record['openTime'] for record in records], dtype=np.int64)
+
+    def select_klines(self, symbol, start_time=None, end_time=None, limit=500):
+        """Applies the klines endpoint rules: from startTime forward, else the last candles before endTime."""
+        open_times = self.open_times[symbol]
+        lo = 0 if start_time is None else int(np.searchsorted(open_times, start_time, side='left'))
+        hi = len(open_times) if end_time is None else int(np.searchsorted(open_times, end_time, side='right'))
+        if start_time is None:
+            lo = max(lo, hi - limit)
+        return self.klines[symbol][lo:min(hi, lo + limit)]
+
+    def ticker(self, symbol):
+        """24hr ticker computed from the candles of the last recorded day."""
+        open_times = self.open_times[symbol]
+        last = int(open_times[-1])
+        window = self.klines[symbol][int(np.searchsorted(open_times, last - 24 * 3600 * 1000, side='right')):]
+        open_price, last_price = float(window[0][1]), float(window[-1][4])
+        volume = sum(float(kline[5]) for kline in window)
+        quote_volume = sum(float(kline[7]) for kline in window)
+        return {
+            'symbol': symbol,
+            'priceChange': f"{last_price - open_price:.8f}",
+            'priceChangePercent': f"{(last_price - open_price) / open_price * 100:.3f}",
+            'weightedAvgPrice': f"{quote_volume / volume if volume else 0:.8f}",
+            'openPrice': window[0][1],
+            'highPrice': f"{max(float(kline[2]) for kline in window):.8f}",
+            'lowPrice': f"{min(float(kline[3]) for kline in window):.8f}",
+            'lastPrice': window[-1][4],
+            'volume': f"{volume:.8f}",
+            'quoteVolume': f"{quote_volume:.8f}",
+            'openTime': window[0][0],
+            'closeTime': window[-1][6],
+            'count': sum(int(kline[8]) for kline in window),
+        }
+
+    def candle_trades(self, symbol, index):
+        """
+        Deterministic synthetic aggregated trades of one recorded candle.
+
+        Prices walk from the candle open to its close within [low, high] and
+        quantities add up to the candle volume. Trade ids are
+        `index * TRADES_PER_CANDLE + k`, so pages can be addressed by id.
+        """
+        kline = self.klines[symbol][index]
+        open_time, close_time = kline[0], kline[6]
+        o, h, l, c, v = (float(x) for x in kline[1:6])
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}:{index}".encode()))
+
+        prices = np.linspace(o, c, TRADES_PER_CANDLE) + rng.normal(0, (h - l) / 6 or 1e-8, TRADES_PER_CANDLE)
+        prices = np.clip(prices, l, h)
+        prices[0], prices[-1] = o, c
+        qty = rng.random(TRADES_PER_CANDLE) + 1e-3
+        qty *= v / qty.sum()
+        times = np.sort(rng.integers(open_time, close_time, TRADES_PER_CANDLE))
+        buyer_maker = rng.random(TRADES_PER_CANDLE) < 0.5
+
+        first = index * TRADES_PER_CANDLE
+        return [
+            {'a': first + k, 'p': f"{prices[k]:.8f}", 'q': f"{qty[k]:.8f}",
+             'f': 2 * (first + k), 'l': 2 * (first + k) + 1, 'T': int(times[k]),
+             'm': bool(buyer_maker[k]), 'M': True}
+            for k in range(TRADES_PER_CANDLE)
+        ]
+
+    def select_agg_trades(self, symbol, from_id=None, start_time=None, end_time=None, limit=500):
+        """Applies the aggTrades endpoint rules (fromId, or startTime/endTime)."""
+        open_times = self.open_times[symbol]
+        if from_id is not None:
+            index = from_id // TRADES_PER_CANDLE
+        elif start_time is not None:
+            index = max(0, int(np.searchsorted(open_times, start_time, side='right')) - 1)
+        else:
+            index = max(0, len(open_times) - 1 - limit // TRADES_PER_CANDLE)
+
+        trades = []
+        while index < len(open_times) and len(trades) < limit:
+            for trade in self.candle_trades(symbol, index):
+                if from_id is not None and trade['a'] < from_id:
+                    continue
+                if start_time is not None and trade['T'] < start_time:
+                    continue
+                if end_time is not None and trade['T'] > end_time:
+                    return trades
+                trades.append(trade)
+                if len(trades) == limit:
+                    break
+            index += 1
+        return trades
+
+
+class WeightLimiter:
+    """
+    Per-IP request-weight accounting over one-minute windows (`window` seconds).
+
+    Requests over the limit get a 429 with Retry-After; clients that keep
+    sending requests while limited get a 418 (IP ban) like on Binance.
+    """
+    def __init__(self, limit=6000, ban_after=5, ban_seconds=120, window=60):
+        self.limit = limit
+        self.window = window
+        self.ban_after = ban_after
+        self.ban_seconds = ban_seconds
+        self.used = {}
+        self.violations = {}
+        self.banned_until = {}
+
+    def spend(self, ip, weight):
+        """Returns (status, used weight, retry after) for a request of `weight`."""
+        now = time.time()
+        window = int(now // self.window)
+        retry_after = (window + 1) * self.window - now
+
+        if self.banned_until.get(ip, 0) > now:
+            return 418, self.used.get(ip, (window, 0))[1], self.banned_until[ip] - now
+
+        used_window, used = self.used.get(ip, (window, 0))
+        if used_window != window:
+            used, self.violations[ip] = 0, 0
+
+        if used + weight > self.limit:
+            self.violations[ip] = self.violations.get(ip, 0) + 1
+            if self.violations[ip] > self.ban_after:
+                self.banned_until[ip] = now + self.ban_seconds
+                return 418, used, self.ban_seconds
+            self.used[ip] = (window, used)
+            return 429, used, retry_after
+
+        self.used[ip] = (window, used + weight)
+        return 200, used + weight, 0
+
+
+def create_app(market, latency=0.0, jitter=0.0, weight_limit=6000, ws_rate=10.0, ws_updates_per_candle=4,
+               weight_window=60):
+    """
+    Builds the aiohttp application serving `market`.
+
+    Parameters:
+    ----------
+    market: RecordedMarket
+        Recorded data to serve.
+    latency, jitter: float
+        Added delay per request in seconds (latency + uniform(0, jitter)).
+    weight_limit: int
+        Request weight allowed per IP and per minute.
+    weight_window: int
+        Length in seconds of the rate-limit window (shorter than a minute in tests).
+    ws_rate: float
+        Kline events pushed per second on each WebSocket stream.
+    ws_updates_per_candle: int
+        Events pushed per candle, the last one closing it.
+    """
+    limiter = WeightLimiter(weight_limit, window=weight_window)
+
+    def error(status, code, msg, headers=None):
+        return web.json_response({'code': code, 'msg': msg}, status=status, headers=headers)
+
+    async def serve(request, weight, build):
+        if latency or jitter:
+            await asyncio.sleep(latency + random.uniform(0, jitter))
+
+        status, used, retry_after = limiter.spend(request.remote, weight)
+        headers = {'X-MBX-USED-WEIGHT-1M': str(used)}
+        if status != 200:
+            headers['Retry-After'] = str(int(retry_after) + 1)
+            return error(status, -1003, 'Too much request weight used.', headers)
+
+        symbol = request.query.get('symbol')
+        if symbol is not None and symbol not in market.klines:
+            return error(400, -1121, 'Invalid symbol.', headers)
+        try:
+            return web.json_response(build(request.query), headers=headers)
+        except ValueError as e:
+            return error(400, -1100, str(e), headers)
+
+    def int_param(query, name, default=None, maximum=None):
+        if name not in query:
+            return default
+        value = int(query[name])
+        return min(value, maximum) if maximum else value
+
+    async def klines(request):
+        def build(query):
+            if query.get('interval') != market.interval:
+                raise ValueError(f"Only the recorded interval {market.interval} is available.")
+            return market.select_klines(query['symbol'], int_param(query, 'startTime'),
+                                        int_param(query, 'endTime'), int_param(query, 'limit', 500, 1000))
+        return await serve(request, ENDPOINT_WEIGHTS['klines'], build)
+
+    async def ticker(request):
+        if 'symbols' in request.query:
+            symbols = json.loads(request.query['symbols'])
+            unknown = [symbol for symbol in symbols if symbol not in market.klines]
+            if unknown:
+                return error(400, -1121, f"Invalid symbols {unknown}.")
+            return await serve(request, ENDPOINT_WEIGHTS['tickers'],
+                               lambda query: [market.ticker(symbol) for symbol in symbols])
+        return await serve(request, ENDPOINT_WEIGHTS['ticker'], lambda query: market.ticker(query['symbol']))
+
+    async def agg_trades(request):
+        def build(query):
+            return market.select_agg_trades(query['symbol'], int_param(query, 'fromId'), int_param(query, 'startTime'),
+                                            int_param(query, 'endTime'), int_param(query, 'limit', 500, 1000))
+        return await serve(request, ENDPOINT_WEIGHTS['aggTrades'], build)
+
+    async def trades(request):
+        def build(query):
+            latest = market.select_agg_trades(query['symbol'], limit=int_param(query, 'limit', 500, 1000))
+            return [{'id': t['a'], 'price': t['p'], 'qty': t['q'],
+                     'quoteQty': f"{float(t['p']) * float(t['q']):.8f}", 'time': t['T'],
+                     'isBuyerMaker': t['m'], 'isBestMatch': t['M']} for t in latest]
+        return await serve(request, ENDPOINT_WEIGHTS['trades'], build)
+
+    async def websocket(request):
+        """Pushes kline events for streams like `tonusdt@kline_4h` (several joined with '/')."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        symbols = [stream.split('@')[0].upper() for stream in request.match_info['streams'].split('/')]
+        symbols = [symbol for symbol in symbols if symbol in market.klines]
+        delay = 1.0 / ws_rate if ws_rate > 0 else 0
+
+        async def push():
+            index = 0
+            while not ws.closed and symbols:
+                for symbol in symbols:
+                    kline = market.klines[symbol][index % len(market.klines[symbol])]
+                    for update in range(1, ws_updates_per_candle + 1):
+                        closed = update == ws_updates_per_candle
+                        event = {
+                            'e': 'kline', 'E': int(time.time() * 1000), 's': symbol,
+                            'k': {'t': kline[0], 'T': kline[6], 's': symbol, 'i': market.interval,
+                                  'o': kline[1], 'c': kline[4], 'h': kline[2], 'l': kline[3],
+                                  'v': kline[5], 'n': kline[8], 'x': closed, 'q': kline[7],
+                                  'V': kline[9], 'Q': kline[10], 'B': kline[11]},
+                        }
+                        await ws.send_str(json.dumps(event))
+                        await asyncio.sleep(delay)
+                index += 1
+
+        # Reading the socket is what processes the client's close frame
+        pusher = asyncio.ensure_future(push())
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            pusher.cancel()
+
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/api/v3/klines', klines)
+    app.router.add_get('/api/v3/ticker/24hr', ticker)
+    app.router.add_get('/api/v3/aggTrades', agg_trades)
+    app.router.add_get('/api/v3/trades', trades)
+    app.router.add_get('/ws/{streams:.+}', websocket)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Binance replay server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--data-dir', default=DATA_RAW_DIR)
+    parser.add_argument('--interval', default='4h', help="Interval of the recorded klines")
+    parser.add_argument('--latency', type=float, default=0.0, help="Added delay per request (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra delay per request (s)")
+    parser.add_argument('--weight-limit', type=int, default=6000, help="Request weight per IP and minute")
+    parser.add_argument('--ws-rate', type=float, default=10.0, help="Kline events per second per stream")
+    args = parser.parse_args()
+
+    market = RecordedMarket(args.data_dir, args.interval)
+    print(f"Serving {list(market.klines)} on http://{args.host}:{args.port}")
+    app = create_app(market, args.latency, args.jitter, args.weight_limit, args.ws_rate)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Schéma compact des DataFrames de marché : float32 pour les prix et les indicateurs,
+int8 pour les drapeaux (trend, patterns), symbole catégoriel.
+
+Le schéma s'applique à la lecture (train_model.get_data, dashboard) : les documents
+stockés par l'ETL restent en float64, float32 (environ 7 chiffres significatifs)
+arrondirait les centimes des prix au-delà de 100 000.
+
+Le module ne dépend que de pandas/NumPy pour être importé aussi bien par les scripts
+de src/ que par le dashboard (src.schema).
+"""
+import numpy as np
+import pandas as pd
+
+FLOAT_COLUMNS = [
+    'open', 'high', 'low', 'close', 'volume', 'quoteVolume',
+    'volume_price_ratio', 'BB_MA', 'BB_UPPER', 'BB_LOWER', 'RSI'
+]
+FLAG_COLUMNS = ['trend', 'DOJI', 'HAMMER', 'SHOOTING_STAR']
+
+
+def to_compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes connues au schéma compact (les autres sont inchangées)"""
+    dtypes = {col: np.float32 for col in FLOAT_COLUMNS if col in df.columns}
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            # Un drapeau manquant ne tient pas dans un entier
+            dtypes[col] = np.float32 if df[col].isna().any() else np.int8
+    if 'symbol' in df.columns:
+        dtypes['symbol'] = 'category'
+    return df.astype(dtypes)
+
+
+def to_full(df: pd.DataFrame) -> pd.DataFrame:
+    """Revient à la pleine précision (float64, int64, symbole texte), ex. avant un export BSON"""
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if dtype == np.float32:
+            dtypes[col] = np.float64
+        elif dtype == np.int8:
+            dtypes[col] = np.int64
+        elif isinstance(dtype, pd.CategoricalDtype):
+            dtypes[col] = dtype.categories.dtype
+    return df.astype(dtypes)
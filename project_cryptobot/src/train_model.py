@@ -12,6 +12,8 @@ from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from tensorflow.keras.models import Sequential
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from schema import to_compact, to_full
+from buckets import BUCKET_COLLECTION, read_buckets
 
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '../models')
@@ -25,8 +27,14 @@ host = os.getenv("HOST", "localhost").strip(",")
 port = os.getenv("PORT", "27017").strip(",")
 username = os.getenv("USERNAME", "").strip()
 password = os.getenv("PASSWORD", "").strip()
-def get_data(symbol):
-  
+def get_data(symbol, compact=False, bucketed=False):
+    """
+    Loads the processed candles of a symbol from market_data.
+
+    With `compact`, prices and indicators are float32 and flags int8
+    (see schema.to_compact), about half the memory of the default frame.
+    With `bucketed`, candles are decoded from the bucket documents (see buckets.py).
+    """
     db = MongoClient(host, int(port), username=username, password=password).Cryptobot
     collection = db['market_data']
     query = {"symbol": symbol}
@@ -42,9 +50,11 @@ def get_data(symbol):
         "indicator": 1,
         "_id": 0
     }
-    cursor = collection.find(query,projection).sort("openTime", 1)
-    
-    df = pd.DataFrame(list(cursor))
+    if bucketed:
+        df = read_buckets(db[BUCKET_COLLECTION], symbol)
+    else:
+        cursor = collection.find(query,projection).sort("openTime", 1)
+        df = pd.DataFrame(list(cursor))
     
     if "indicator" in df.columns:
         indicator_df = pd.json_normalize(df['indicator'])
@@ -72,8 +82,7 @@ def get_data(symbol):
     
     df['openTime'] = pd.to_datetime(df['openTime'])
     df.set_index('openTime', inplace=True)
-    df = df.drop(df[df['volume']==0].index)
-    return df
+    return to_compact(df) if compact else df
 
 def model_preprocessing(df, features, target, test_size):
     """
@@ -96,7 +105,11 @@ def model_preprocessing(df, features, target, test_size):
         Scaler, scaler_y: minmax scalers
     """
 
-    X_train, X_test, y_train, y_test = train_test_split(df[features].values, df[target].values, test_size=test_size, random_state=42, shuffle=False)
+    # Only the model inputs are converted to float64 for the scalers, the frame stays compact.
+    # Values of a compact frame keep their float32 rounding (about 7 significant digits).
+    X = to_full(df[features]).to_numpy(dtype=np.float64)
+    y = to_full(df[[target]])[target].to_numpy(dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42, shuffle=False)
     #X_train, X_test, y_train, y_test = np.array(X_train), np.array(X_test), np.array(y_train), np.array(y_test)
     
 
@@ -205,6 +218,8 @@ def main():
         config = json.load(config_file)
     symbols = config["symbols"]
     test_size = 0.05
+    compact = config.get("compact_frames", False)
+    bucketed = config.get("storage", "collection") == "buckets"
     print(f"Symbols to process: {symbols}")
 
     #Define features and target
@@ -213,7 +228,7 @@ def main():
 
     for symbol in symbols:
         try:
-            df = get_data(symbol)
+            df = get_data(symbol, compact=compact, bucketed=bucketed)
             X_train, X_test, y_train, y_test, scaler, scaler_y = model_preprocessing(df, features, target, test_size)
             save_scalers(scaler, scaler_y, symbol)
             input_shape = (X_train.shape[1],X_train.shape[2])
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from extract import interval_to_milliseconds
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+# Rules rejecting a candle, in the order they are counted
+RULES = ['missing_values', 'ohlc', 'negative_volume', 'zero_volume', 'duplicate_time', 'non_monotonic']
+
+
+def _open_time_ms(open_time):
+    # Missing times become the smallest int64, they never move the running maximum
+    if pd.api.types.is_datetime64_any_dtype(open_time):
+        return open_time.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    return open_time.fillna(np.iinfo(np.int64).min).to_numpy(dtype=np.int64)
+
+
+def validate_klines(df, interval=None, reject_zero_volume=True):
+    """
+    Checks a batch of klines with vectorized rules, before processing and insertion.
+
+    A candle is rejected when:
+        - missing_values: openTime, a price or the volume is missing.
+        - ohlc: high is below open/close/low, or low is above open/close.
+        - negative_volume / zero_volume: the volume is < 0 / == 0 (zero volume candles
+          are market halts, only rejected with `reject_zero_volume`).
+        - duplicate_time: its openTime was already seen earlier in the batch.
+        - non_monotonic: its openTime is before a previous openTime.
+
+    A rejected candle is counted for the first rule it breaks only.
+
+    Parameters:
+    ----------
+    df: DataFrame
+        Raw klines (see fetch_data_klines(as_frame=True)), openTime as datetimes or ms.
+    interval: str
+        Candle interval, used to count the candles missing between two openTimes.
+    reject_zero_volume: bool
+        Whether zero volume candles are rejected.
+
+    Returns:
+    -------
+    A boolean NumPy mask of the valid rows, and a dictionary rule -> rejected rows
+    (plus 'missing_candles' when `interval` is given, gaps are counted not rejected).
+    """
+    n = len(df)
+    prices = df[PRICE_COLUMNS].to_numpy(dtype=np.float64)
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    open_time = df['openTime']
+
+    missing = np.isnan(prices).any(axis=1) | np.isnan(volume) | open_time.isna().to_numpy()
+    open_, high, low, close = prices.T
+    # Comparisons with NaN are False, missing values are only counted once
+    ohlc = (high < np.fmax(open_, close)) | (high < low) | (low > np.fmin(open_, close))
+
+    times = _open_time_ms(open_time)
+    duplicate = pd.Series(times).duplicated().to_numpy()
+    backwards = np.zeros(n, dtype=bool)
+    backwards[1:] = times[1:] < np.maximum.accumulate(times)[:-1]
+
+    checks = {
+        'missing_values': missing,
+        'ohlc': ohlc,
+        'negative_volume': volume < 0,
+        'zero_volume': (volume == 0) if reject_zero_volume else np.zeros(n, dtype=bool),
+        'duplicate_time': duplicate,
+        'non_monotonic': backwards,
+    }
+
+    valid = np.ones(n, dtype=bool)
+    counters = {}
+    for rule in RULES:
+        rejected = checks[rule] & valid
+        counters[rule] = int(rejected.sum())
+        valid &= ~rejected
+
+    if interval is not None:
+        kept = np.sort(times[valid])
+        gaps = np.diff(kept) // interval_to_milliseconds(interval) - 1
+        counters['missing_candles'] = int(gaps[gaps > 0].sum())
+    return valid, counters
+
+
+def clean_klines(df, symbol, interval=None, reject_zero_volume=True):
+    """
+    Drops the candles rejected by validate_klines and reports the counters of the batch.
+    """
+    valid, counters = validate_klines(df, interval, reject_zero_volume)
+    issues = {rule: count for rule, count in counters.items() if count}
+    if issues:
+        print(f"Validation of {symbol}: {len(df) - int(valid.sum())}/{len(df)} candles rejected {issues}")
+    if valid.all():
+        return df
+    return df[valid]
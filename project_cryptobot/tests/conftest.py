@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../src')
+sys.path.append(SRC_DIR)
+
+from extract import load_config
+
+
+class ReplayServer:
+    """
+    Runs replay_server.create_app in a background thread on a free local port.
+
+    Parameters:
+    ----------
+    options: dict
+        Keyword arguments of create_app (weight_limit, weight_window...).
+    """
+    def __init__(self, **options):
+        from aiohttp import web
+        from replay_server import RecordedMarket, create_app
+
+        async def serve():
+            runner = web.AppRunner(create_app(self.market, **options))
+            await runner.setup()
+            await web.TCPSite(runner, '127.0.0.1', 0).start()
+            return runner
+
+        self.market = RecordedMarket()
+        self.loop = asyncio.new_event_loop()
+        self.runner = self.loop.run_until_complete(serve())
+        host, port = self.runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def endpoint(self, path):
+        return f"{self.url}/api/v3/{path}"
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+@pytest.fixture
+def replay_server():
+    """Factory of replay servers, all stopped at the end of the test."""
+    servers = []
+
+    def start(**options):
+        server = ReplayServer(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(scope="session")
+def config():
+    return load_config()
@@ -0,0 +1,67 @@
+"""
+The chunked, incremental and panel engines of DataProcessor must give the same
+candles and indicators as DataProcessor.process_dataframe over the whole history.
+"""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import SRC_DIR
+from Data_processor import DataProcessor, IncrementalIndicators, PanelIndicators
+
+RECORDED_KLINES = os.path.join(SRC_DIR, '../data/data_raw/TONUSDT_data_klines.json')
+SYMBOL = "TONUSDT"
+
+
+@pytest.fixture(scope="module")
+def klines():
+    """Raw recorded klines, as returned by the API (openTime in ms, prices as strings)"""
+    with open(RECORDED_KLINES, 'r') as file:
+        return pd.DataFrame(json.load(file)['data']).sort_values('openTime', ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def expected(klines):
+    return DataProcessor.process_dataframe(klines.copy()).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 37])
+def test_process_chunks_matches_process_dataframe(klines, expected, chunk_size):
+    # Neither size divides the 639 candles, 7 is also shorter than the LOOKBACK carry
+    assert len(klines) % chunk_size
+    chunks = (klines.iloc[i:i + chunk_size] for i in range(0, len(klines), chunk_size))
+
+    result = pd.concat(list(DataProcessor.process_chunks(chunks)), ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_incremental_update_matches_process_dataframe(klines, expected):
+    # All the candles are closed: each batch moves the state to its last candle
+    now = pd.to_datetime(klines['closeTime'].max(), unit='ms') + pd.Timedelta(hours=1)
+    split = len(klines) // 2
+
+    state = IncrementalIndicators.new_state(SYMBOL)
+    first, state = IncrementalIndicators.update(state, klines.iloc[:split], now=now)
+    # The second batch overlaps the first one, the candles already in the state are skipped
+    second, state = IncrementalIndicators.update(state, klines.iloc[split - 10:], now=now)
+
+    result = pd.concat([first, second], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert state['last_open_time'] == expected['openTime'].iloc[-1]
+
+
+def test_panel_matches_process_dataframe_per_symbol(klines):
+    # Ragged panel: the short symbol is padded with NaN before its first candle
+    frames = {
+        "TONUSDT": klines,
+        "SHORTUSDT": klines.iloc[-60:].reset_index(drop=True),
+        "OLDUSDT": klines.iloc[:400].reset_index(drop=True),
+    }
+    results = PanelIndicators.process_frames(frames)
+
+    assert list(results) == list(frames)
+    for symbol, df in frames.items():
+        expected = DataProcessor.process_dataframe(df.copy()).reset_index(drop=True)
+        pd.testing.assert_frame_equal(results[symbol].reset_index(drop=True), expected, check_dtype=False)
@@ -0,0 +1,50 @@
+from extract import fetch_data_klines
+from extract_async import fetch_all_klines
+from http_client import configure_client
+
+SYMBOLS = ["TONUSDT", "SHIBUSDT"]
+LIMIT = 1000
+
+
+def fetch_sync(server, columns):
+    endpoint = server.endpoint("klines")
+    return {symbol: fetch_data_klines(endpoint, symbol, "4h", columns, LIMIT) for symbol in SYMBOLS}
+
+
+def test_fetch_all_klines_matches_sync_fetch(replay_server, config):
+    server = replay_server()
+    columns = config["columns_klines"]
+
+    expected = fetch_sync(server, columns)
+    result = fetch_all_klines(server.endpoint("klines"), SYMBOLS, "4h", columns, LIMIT)
+
+    for symbol in SYMBOLS:
+        assert len(expected[symbol]) == len(server.market.klines[symbol])
+        assert result[symbol] == expected[symbol]
+
+
+def test_fetch_all_klines_backs_off_on_429(replay_server, config, capsys):
+    columns = config["columns_klines"]
+    expected = fetch_sync(replay_server(), columns)
+
+    # 3 klines requests per 1 s window: the concurrent symbols are rate limited
+    limited = replay_server(weight_limit=6, weight_window=1)
+    result = fetch_all_klines(limited.endpoint("klines"), SYMBOLS, "4h", columns, LIMIT)
+
+    assert "Rate limited (429)" in capsys.readouterr().out
+    for symbol in SYMBOLS:
+        assert result[symbol] == expected[symbol]
+
+
+def test_fetch_all_klines_records_http_stats(replay_server, config):
+    server = replay_server()
+    endpoint = server.endpoint("klines")
+    client = configure_client()
+
+    result = fetch_all_klines(endpoint, SYMBOLS, "4h", config["columns_klines"], LIMIT)
+
+    # One page per LIMIT candles plus the empty page ending each symbol
+    pages = sum(-(-len(result[symbol]) // LIMIT) + 1 for symbol in SYMBOLS)
+    stats = client.stats()[endpoint]
+    assert stats["requests"] == pages
+    assert stats["errors"] == stats["retries"] == 0
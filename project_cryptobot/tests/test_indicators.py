@@ -0,0 +1,130 @@
+"""
+Equivalence of the indicators kernels with the pandas formulas they replaced,
+on the recorded TONUSDT candles. Rolling means round a few exact half-cent
+ties differently from pandas' running sums: those rows are pinned so that
+any new difference fails.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+from conftest import SRC_DIR
+
+RECORDED_KLINES = os.path.join(SRC_DIR, '../data/data_raw/TONUSDT_data_klines.json')
+# Rows rounded 0.01 apart from pandas on exact ties
+BB_TIES = 1
+RSI_TIES = 2
+
+
+@pytest.fixture(scope="module")
+def candles():
+    """Recorded candles prepared like DataProcessor.process_dataframe (prices rounded to 2 decimals)"""
+    with open(RECORDED_KLINES, 'r') as file:
+        df = pd.DataFrame(json.load(file)['data']).sort_values('openTime', ignore_index=True)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col]).round(2)
+    return df
+
+
+def differences(actual, expected):
+    """Absolute differences on the rows where the values differ (NaN == NaN)"""
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    differ = ~((actual == expected) | (np.isnan(actual) & np.isnan(expected)))
+    return np.abs(actual - expected)[differ]
+
+
+def assert_ties(actual, expected, ties):
+    diff = differences(actual, expected)
+    assert len(diff) == ties
+    assert np.all(diff <= 0.01 + 1e-9)
+
+
+def pandas_bollinger(df, n=20, s=2, bands_from_rounded_ma=True):
+    typical_price = (df['high'] + df['low'] + df['close']) / 3
+    mean = typical_price.rolling(window=n).mean()
+    stddev = typical_price.rolling(window=n).std()
+    center = mean.round(2) if bands_from_rounded_ma else mean
+    return mean.round(2), (center + stddev * s).round(2), (center - stddev * s).round(2)
+
+
+def pandas_rsi(df, n=14, min_periods=None):
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).round(2)
+    loss = (-delta.where(delta < 0, 0)).round(2)
+    rs = gain.rolling(window=n, min_periods=min_periods).mean() / loss.rolling(window=n, min_periods=min_periods).mean()
+    return (100 - (100 / (1 + rs))).round(2)
+
+
+@pytest.mark.parametrize("bands_from_rounded_ma", [True, False])
+def test_bollinger_matches_pandas(candles, bands_from_rounded_ma):
+    expected = pandas_bollinger(candles, bands_from_rounded_ma=bands_from_rounded_ma)
+    actual = indicators.bollinger_bands(candles['high'], candles['low'], candles['close'],
+                                        bands_from_rounded_ma=bands_from_rounded_ma)
+    assert_ties(actual[0], expected[0], BB_TIES)
+    for band, expected_band in zip(actual[1:], expected[1:]):
+        # The ETL bands start from the rounded average and inherit its tie
+        assert_ties(band, expected_band, BB_TIES if bands_from_rounded_ma else 0)
+
+
+@pytest.mark.parametrize("min_periods", [None, 1])
+def test_rsi_matches_pandas(candles, min_periods):
+    assert_ties(indicators.rsi(candles['close'], min_periods=min_periods), pandas_rsi(candles, min_periods=min_periods),
+                RSI_TIES)
+
+
+def test_ema_matches_pandas(candles):
+    for period in [9, 21, 50]:
+        expected = candles['close'].ewm(span=period, adjust=False).mean().round(2)
+        np.testing.assert_array_equal(np.round(indicators.ema(candles['close'], period), 2), expected)
+
+
+def test_ema_decays_across_nan_gaps_like_pandas(candles):
+    close = candles['close'].copy()
+    # Missing first candle, isolated gaps and a long gap
+    close.iloc[[0, 30, 31, 120]] = np.nan
+    close.iloc[200:240] = np.nan
+    for period in [9, 21, 50]:
+        expected = close.ewm(span=period, adjust=False).mean()
+        np.testing.assert_array_equal(indicators.ema(close, period), expected)
+
+
+def test_macd_matches_pandas(candles):
+    line = (candles['close'].ewm(span=12, adjust=False).mean()
+            - candles['close'].ewm(span=26, adjust=False).mean()).round(2)
+    signal = line.ewm(span=9, adjust=False).mean().round(2)
+    expected = line, signal, (line - signal).round(2)
+    for actual_values, expected_values in zip(indicators.macd(candles['close']), expected):
+        np.testing.assert_array_equal(actual_values, expected_values)
+
+
+def test_stochastic_matches_pandas(candles):
+    lowest_low = candles['low'].rolling(window=14).min()
+    highest_high = candles['high'].rolling(window=14).max()
+    k = ((candles['close'] - lowest_low) / (highest_high - lowest_low) * 100).round(2)
+    d = k.rolling(window=3).mean().round(2)
+    actual_k, actual_d = indicators.stochastic(candles['high'], candles['low'], candles['close'])
+    np.testing.assert_array_equal(actual_k, k)
+    np.testing.assert_array_equal(actual_d, d)
+
+
+def test_candle_patterns_match_pandas(candles):
+    df = candles
+    body_size = (abs(df['close'] - df['open'])).round(2)
+    upper_shadow = (df['high'] - df[['open', 'close']].max(axis=1)).round(2)
+    lower_shadow = (df[['open', 'close']].min(axis=1) - df['low']).round(2)
+    candle_size = (df['high'] - df['low']).round(2)
+    expected = (
+        (body_size <= candle_size * 0.1).astype(int),
+        ((lower_shadow > body_size * 2) & (upper_shadow <= body_size * 0.5)).astype(int),
+        ((upper_shadow > body_size * 2) & (lower_shadow <= body_size * 0.5)).astype(int),
+    )
+
+    properties = indicators.candle_properties(df['open'], df['high'], df['low'], df['close'])
+    for actual_values, expected_values in zip(properties, (body_size, upper_shadow, lower_shadow, candle_size)):
+        np.testing.assert_array_equal(actual_values, expected_values)
+    for actual_values, expected_values in zip(indicators.candle_patterns(*properties), expected):
+        np.testing.assert_array_equal(actual_values, expected_values)
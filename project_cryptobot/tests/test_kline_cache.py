@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+import kline_cache
+from extract import fetch_data_klines
+from kline_cache import KlineCache
+
+SYMBOL = "TONUSDT"
+LIMIT = 1000
+END_DATE = datetime(2024, 12, 1, tzinfo=timezone.utc)
+
+
+def test_get_klines_fetches_the_first_open_time_once(replay_server, config, tmp_path, monkeypatch, capsys):
+    server = replay_server()
+    columns = config["columns_klines"]
+    calls = []
+    fetch = kline_cache.fetch_first_open_time
+
+    def fetch_first_open_time(*args):
+        calls.append(args)
+        return fetch(*args)
+
+    monkeypatch.setattr(kline_cache, "fetch_first_open_time", fetch_first_open_time)
+
+    cache = KlineCache(server.endpoint("klines"), columns, LIMIT, cache_dir=str(tmp_path))
+    first = cache.get_klines(SYMBOL, "4h", end_date=END_DATE)
+    capsys.readouterr()
+    second = KlineCache(server.endpoint("klines"), columns, LIMIT, cache_dir=str(tmp_path)).get_klines(
+        SYMBOL, "4h", end_date=END_DATE)
+
+    assert len(calls) == 1
+    # The second call is answered from disk only
+    assert "Cache miss" not in capsys.readouterr().out
+    assert first.equals(second)
+    expected = fetch_data_klines(server.endpoint("klines"), SYMBOL, "4h", columns, LIMIT, as_frame=True)
+    assert len(first) == len(expected) == len(server.market.klines[SYMBOL])
@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+from pymongo.errors import DuplicateKeyError
+
+from load import CANDLE_KEY, create_candle_key
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().Cryptobot
+
+
+def test_create_candle_key_removes_duplicates_of_plain_inserts(db):
+    open_time = datetime.datetime(2024, 1, 1)
+    older, newer = datetime.datetime(2024, 1, 2), datetime.datetime(2024, 1, 3)
+    db.market_data.insert_many([
+        {"symbol": "BTCUSDT", "openTime": open_time, "close": 1.0, "last_updated": older},
+        {"symbol": "BTCUSDT", "openTime": open_time, "close": 2.0, "last_updated": newer},
+        {"symbol": "BTCUSDT", "openTime": open_time, "close": 1.5, "last_updated": older},
+        {"symbol": "ETHUSDT", "openTime": open_time, "close": 3.0, "last_updated": older},
+    ])
+    with pytest.raises(DuplicateKeyError):
+        db.market_data.create_index(CANDLE_KEY, unique=True)
+
+    create_candle_key(db.market_data)
+
+    candles = {doc["symbol"]: doc["close"] for doc in db.market_data.find()}
+    assert db.market_data.count_documents({}) == 2
+    assert candles == {"BTCUSDT": 2.0, "ETHUSDT": 3.0}
+    with pytest.raises(DuplicateKeyError):
+        db.market_data.insert_one({"symbol": "BTCUSDT", "openTime": open_time, "close": 4.0})
+
+    # Idempotent once the index exists
+    create_candle_key(db.market_data)
+    assert db.market_data.count_documents({}) == 2
@@ -0,0 +1,210 @@
+"""
+Equivalence of mongo_indicators.indicator_pipeline with DataProcessor.process_dataframe
+on the recorded TONUSDT candles, with a flat stretch where the RSI is undefined.
+
+The stages are run by a small evaluator of the operators the pipeline uses. MongoDB
+itself runs them in test_pipeline_matches_process_dataframe_in_mongod when
+MONGODB_TEST_URI points to a mongod (5.0+ for $setWindowFields).
+
+Tolerance: the window averages are not summed in the same order as the pandas rolling
+sums (MongoDB keeps compensated sums, pandas running sums, the evaluator NumPy's), which
+only matters on exact half-cent ties: the evaluator may differ by 0.01 on a pinned number
+of rows, nowhere else. The evaluator rounds like pandas (np.round), while $round rounds
+the decimal value half to even, so against mongod the 3-decimal TONUSDT prices can also
+round 0.01 apart: that test only bounds the differences.
+"""
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SRC_DIR
+from Data_processor import DataProcessor
+from mongo_indicators import RAW_COLLECTION, build_raw_documents, compute_indicators, indicator_pipeline
+
+RECORDED_KLINES = os.path.join(SRC_DIR, '../data/data_raw/TONUSDT_data_klines.json')
+SYMBOL = "TONUSDT"
+CANDLE_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'trend', 'volume_price_ratio']
+INDICATOR_FIELDS = ['BB_MA', 'BB_UPPER', 'BB_LOWER', 'RSI', 'DOJI', 'HAMMER', 'SHOOTING_STAR']
+# Rows rounded 0.01 apart from process_dataframe on exact ties, per indicator
+EVALUATOR_TIES = {'BB_MA': 1, 'BB_UPPER': 1, 'BB_LOWER': 1, 'RSI': 1}
+
+
+def evaluate(expression, doc):
+    """Value of an aggregation expression for a document ($$NOW is left as is)"""
+    if isinstance(expression, str) and expression.startswith('$$'):
+        return expression
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith('$'):
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+
+    (operator, arguments), = expression.items()
+    if operator == '$cond':
+        return evaluate(arguments[1] if evaluate(arguments[0], doc) else arguments[2], doc)
+    if operator == '$abs':
+        return abs(evaluate(arguments, doc))
+    values = [evaluate(argument, doc) for argument in arguments]
+    if operator == '$round':
+        return None if values[0] is None else float(np.round(values[0], values[1]))
+    if operator == '$ifNull':
+        return values[0] if values[0] is not None else values[1]
+    operators = {
+        '$add': sum,
+        '$subtract': lambda v: v[0] - v[1],
+        '$multiply': lambda v: v[0] * v[1],
+        '$divide': lambda v: v[0] / v[1],
+        '$max': max,
+        '$min': min,
+        '$gt': lambda v: v[0] > v[1],
+        '$lte': lambda v: v[0] <= v[1],
+        '$eq': lambda v: v[0] == v[1],
+        '$and': all,
+    }
+    return operators[operator](values)
+
+
+def matches(query, doc):
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(matches(item, doc) for item in condition):
+                return False
+        elif isinstance(condition, dict):
+            if '$gte' in condition and not doc[field] >= condition['$gte']:
+                return False
+            if '$ne' in condition and not doc[field] != condition['$ne']:
+                return False
+        elif doc[field] != condition:
+            return False
+    return True
+
+
+def window_fields(docs, output):
+    """$setWindowFields over a single symbol sorted by openTime"""
+    docs = sorted(docs, key=lambda doc: doc['openTime'])
+    results = [dict(doc) for doc in docs]
+    for name, spec in output.items():
+        if '$shift' in spec:
+            field = spec['$shift']['output'][1:]
+            for i, doc in enumerate(results):
+                doc[name] = docs[i - 1][field] if i > 0 else None
+            continue
+        lower = spec['window']['documents'][0]
+        operator, field = next((key, value) for key, value in spec.items() if key != 'window')
+        for i, doc in enumerate(results):
+            window = docs[max(0, i + lower):i + 1]
+            if operator == '$count':
+                doc[name] = len(window)
+                continue
+            values = np.array([item[field[1:]] for item in window])
+            if operator == '$avg':
+                doc[name] = values.mean()
+            else:
+                doc[name] = values.std(ddof=1) if len(values) > 1 else None
+    return results
+
+
+def run_pipeline(stages, docs):
+    """Documents reaching the $merge stage"""
+    for stage in stages:
+        (operator, arguments), = stage.items()
+        if operator == '$match':
+            docs = [doc for doc in docs if matches(arguments, doc)]
+        elif operator == '$project':
+            docs = [{key: doc[key] if value == 1 else evaluate(value, doc)
+                     for key, value in arguments.items() if value != 0} for doc in docs]
+        elif operator == '$set':
+            docs = [{**doc, **evaluate(arguments, doc)} for doc in docs]
+        elif operator == '$setWindowFields':
+            docs = window_fields(docs, arguments['output'])
+        elif operator == '$merge':
+            return docs
+        else:
+            raise KeyError(operator)
+    return docs
+
+
+@pytest.fixture(scope="module")
+def candles():
+    with open(RECORDED_KLINES, 'r') as file:
+        df = pd.DataFrame(json.load(file)['data'])
+    df['openTime'] = pd.to_datetime(df['openTime'], unit='ms')
+    for col in ['open', 'high', 'low', 'close', 'volume', 'quoteVolume']:
+        df[col] = pd.to_numeric(df[col])
+    df = df.sort_values('openTime', ignore_index=True)
+    # Flat stretch: no gain nor loss over the RSI window, those candles are dropped
+    df.loc[100:140, ['open', 'high', 'low', 'close']] = 1.0
+    return df
+
+
+@pytest.fixture(scope="module")
+def expected(candles):
+    return DataProcessor.process_dataframe(candles.copy()).reset_index(drop=True)
+
+
+def differences(actual, expected):
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    return np.abs(actual - expected)[~np.isclose(actual, expected, rtol=0, atol=1e-9, equal_nan=True)]
+
+
+def assert_equivalent(documents, expected, ties):
+    result = pd.DataFrame(documents)
+    assert len(result) == len(expected)
+    np.testing.assert_array_equal(pd.to_datetime(result['openTime']).to_numpy(), expected['openTime'].to_numpy())
+    for field in CANDLE_FIELDS:
+        assert len(differences(result[field], expected[field])) == 0, field
+    indicator = pd.DataFrame(list(result['indicator']))
+    for field in INDICATOR_FIELDS:
+        diff = differences(indicator[field], expected[field])
+        assert len(diff) == ties.get(field, 0), field
+        assert np.all(diff <= 0.01 + 1e-9), field
+
+
+def test_pipeline_matches_process_dataframe(candles, expected):
+    documents = run_pipeline(indicator_pipeline(SYMBOL), build_raw_documents(candles, SYMBOL))
+    assert_equivalent(documents, expected, EVALUATOR_TIES)
+
+
+def test_pipeline_since_matches_full_history(candles):
+    raw = build_raw_documents(candles, SYMBOL)
+    full = pd.DataFrame(run_pipeline(indicator_pipeline(SYMBOL), raw))
+
+    since = full['openTime'][300]
+    position = next(i for i, doc in enumerate(raw) if doc['openTime'] == since)
+    start = raw[position - (DataProcessor.LOOKBACK - 1)]['openTime']
+    partial = pd.DataFrame(run_pipeline(indicator_pipeline(SYMBOL, start, since), raw))
+
+    full = full[full['openTime'] >= since].reset_index(drop=True)
+    assert list(partial['openTime']) == list(full['openTime'])
+    assert list(partial['indicator']) == list(full['indicator'])
+
+
+@pytest.mark.skipif(not os.environ.get("MONGODB_TEST_URI"), reason="MONGODB_TEST_URI is not set")
+def test_pipeline_matches_process_dataframe_in_mongod(candles, expected):
+    from pymongo import ASCENDING, MongoClient
+
+    client = MongoClient(os.environ["MONGODB_TEST_URI"])
+    db = client[f"cryptobot_test_{datetime.datetime.now():%Y%m%d%H%M%S%f}"]
+    try:
+        db[RAW_COLLECTION].insert_many(build_raw_documents(candles, SYMBOL))
+        db.market_data.create_index([("symbol", ASCENDING), ("openTime", ASCENDING)], unique=True)
+        compute_indicators(db, SYMBOL)
+        documents = list(db.market_data.find({"symbol": SYMBOL}, {"_id": 0}).sort("openTime", ASCENDING))
+        # Tie rows follow MongoDB's summation and decimal rounding: only their bound is checked
+        result = pd.DataFrame(documents)
+        indicator = pd.DataFrame(list(result['indicator']))
+        assert list(result['openTime']) == list(expected['openTime'])
+        for field in ['open', 'high', 'low', 'close', 'volume']:
+            assert np.all(differences(result[field], expected[field]) <= 0.01 + 1e-9), field
+        for field in INDICATOR_FIELDS[:4]:
+            assert np.all(differences(indicator[field], expected[field]) <= 0.01 + 1e-9), field
+    finally:
+        client.drop_database(db.name)
+        client.close()